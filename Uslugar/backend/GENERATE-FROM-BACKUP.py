@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Skripta za generiranje INSERT i UPDATE statementa i statistike iz backup datoteke u jednom prolazu.
+Dump se čita i dekodira jednom, a svaki redak ide svim izlazima kojima treba:
+    --insert [TABLICE=]IZLAZ   INSERT-i za tablice (kao GENERATE-INSERT-CATEGORY.py), može više puta
+    --update IZLAZ             UPDATE-i za popravke encodinga (kao GENERATE-UPDATE-FROM-BACKUP.py)
+    --stats IZLAZ              JSON statistika obrade
+
+Primjer:
+    python GENERATE-FROM-BACKUP.py backup.sql --insert Category=INSERT-CATEGORY.sql \\
+        --update UPDATE-FROM-BACKUP.sql --stats stats.json
+
+Ulaz može biti i SQLite staging datoteka (python -m backup_fix.staging):
+tada se uz --ids i --like čitaju samo traženi retci.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from backup_fix import (
+    INSERT_MODES,
+    INSERT_PATTERNS,
+    REPAIR_MODES,
+    UPDATE_MODES,
+    UPDATE_PATTERNS,
+    InsertSink,
+    RepairCache,
+    StatsSink,
+    UpdateSink,
+    make_repair_engine,
+    scan_dump,
+)
+from backup_fix.staging import is_staging_file, scan_staging
+
+
+def parse_insert_target(value):
+    """'Category,Job=out.sql' -> (['Category', 'Job'], 'out.sql'); bez '=' tablica je Category."""
+    tables, sep, output = value.rpartition('=')
+    if not sep:
+        return ['Category'], value
+    return [table.strip() for table in tables.split(',') if table.strip()], output
+
+
+def parse_ids(value):
+    """'a,b,c' ili '@datoteka' (jedan id po retku) -> lista id-eva."""
+    if value.startswith('@'):
+        with open(value[1:], encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        'backup_file',
+        help='Backup: pg_dump plain format (moze biti .gz/.zst), custom arhiva (-Fc), direktorij (-Fd) ili SQLite staging datoteka',
+    )
+    parser.add_argument(
+        '--insert',
+        metavar='[TABLICE=]IZLAZ',
+        action='append',
+        default=[],
+        help='INSERT statementi za tablice odvojene zarezom (default: Category) u IZLAZ; moze se ponoviti',
+    )
+    parser.add_argument('--update', metavar='IZLAZ', default=None, help='UPDATE statementi za popravke encodinga u IZLAZ')
+    parser.add_argument('--stats', metavar='IZLAZ', default=None, help='Statistika obrade u JSON datoteku')
+    parser.add_argument(
+        '--repair-mode',
+        choices=REPAIR_MODES,
+        default='patterns',
+        help='patterns = samo liste uzoraka (backup_fix/patterns.py), codec = generirane codec tablice + liste uzoraka',
+    )
+    parser.add_argument(
+        '--cache-mb',
+        type=float,
+        default=64,
+        help='Memorija za cache popravljenih vrijednosti u MB po izlazu (0 = bez cachea)',
+    )
+    parser.add_argument(
+        '--split-mb',
+        type=float,
+        default=None,
+        help='Podijeli .sql izlaze na dijelove od N MB (svaki dio je zasebna transakcija)',
+    )
+    parser.add_argument(
+        '--output-mode',
+        choices=INSERT_MODES,
+        default='insert',
+        help='--insert: insert = INSERT po retku, multi = viseretcani INSERT, upsert = INSERT ... ON CONFLICT (id) DO UPDATE, copy = COPY ... FROM stdin',
+    )
+    parser.add_argument(
+        '--update-mode',
+        choices=UPDATE_MODES,
+        default='column',
+        help='--update: column = UPDATE po koloni, row = jedan UPDATE po retku, batch = UPDATE ... FROM (VALUES ...) po tablici',
+    )
+    parser.add_argument('--batch-size', type=int, default=500, help='Broj redaka po statementu (multi/upsert i batch)')
+    parser.add_argument('--tables', default=None, help='--update i --stats samo za ove tablice, odvojene zarezom (default: sve)')
+    parser.add_argument('--ids', default=None, help='Staging: samo retci s ovim id-evima (odvojeni zarezom ili @datoteka)')
+    parser.add_argument('--like', metavar='KOLONA=UZORAK', default=None, help='Staging: samo retci gdje je KOLONA LIKE UZORAK')
+    parser.add_argument(
+        '--strict',
+        action='store_true',
+        help='Prijavi retke s neispravnim UTF-8 bajtovima umjesto da se bajtovi tiho izbace',
+    )
+    parser.add_argument(
+        '--no-index',
+        action='store_true',
+        help='Ne koristi indeks COPY sekcija (<dump>.index.json), citaj cijelu datoteku',
+    )
+    args = parser.parse_args()
+
+    if not (args.insert or args.update or args.stats):
+        parser.error('zadaj barem jedan izlaz: --insert, --update ili --stats')
+    if not Path(args.backup_file).exists():
+        print(f"[ERROR] Backup datoteka ne postoji: {args.backup_file}", file=sys.stderr)
+        return False
+
+    staging = is_staging_file(args.backup_file)
+    if (args.ids or args.like) and not staging:
+        parser.error('--ids i --like rade samo sa SQLite staging datotekom (python -m backup_fix.staging)')
+    like = None
+    if args.like:
+        column, sep, pattern = args.like.partition('=')
+        if not sep or not column:
+            parser.error(f'neispravan --like: {args.like}')
+        like = (column, pattern)
+
+    tables = [table.strip() for table in args.tables.split(',') if table.strip()] if args.tables else None
+    source = str(args.backup_file)
+    insert_repair = RepairCache(make_repair_engine(INSERT_PATTERNS, args.repair_mode), args.cache_mb)
+    update_repair = RepairCache(make_repair_engine(UPDATE_PATTERNS, args.repair_mode), args.cache_mb)
+
+    sinks = []
+    for value in args.insert:
+        insert_tables, output = parse_insert_target(value)
+        if not insert_tables or not output:
+            parser.error(f'neispravan --insert: {value}')
+        sinks.append(InsertSink(
+            output, insert_tables, insert_repair,
+            output_mode=args.output_mode, batch_size=args.batch_size, split_mb=args.split_mb, source=source,
+        ))
+    if args.update:
+        sinks.append(UpdateSink(
+            args.update, update_repair,
+            update_mode=args.update_mode, batch_size=args.batch_size, split_mb=args.split_mb,
+            tables=tables, source=source,
+        ))
+    # Statistika zadnja - u nju ulaze sažeci ostalih izlaza
+    if args.stats:
+        sinks.append(StatsSink(args.stats, update_repair, tables=tables, source=source))
+
+    print(f"[INFO] Citanje backup datoteke: {args.backup_file}")
+    print(f"[INFO] Izlazi: {', '.join(sink.name for sink in sinks)}")
+    try:
+        if staging:
+            ids = parse_ids(args.ids) if args.ids else None
+            run = scan_staging(args.backup_file, sinks, ids=ids, like=like, strict=args.strict)
+        else:
+            run = scan_dump(args.backup_file, sinks, use_index=not args.no_index, strict=args.strict)
+    except Exception as e:
+        print(f"[ERROR] Greska pri citanju datoteke: {e}", file=sys.stderr)
+        return False
+
+    print(f"[OK] Procesirano {run['rows']} redaka ({run['decoded']} dekodirano), citanje {run['times']['read']:.2f} s")
+    if run['undecodable']:
+        print(f"[WARNING] {run['undecodable']} redaka s neispravnim UTF-8 preskoceno (--strict)", file=sys.stderr)
+    for sink in sinks:
+        summary = run['sinks'][sink.name]
+        seconds = run['times'][sink.name]
+        if isinstance(sink, InsertSink):
+            for table in summary['missing_tables']:
+                print(f"[WARNING] Tablica {table} nije pronadjena u backup datoteci")
+            print(f"[OK] {sink.name}: {summary['statements']} statementa ({summary['rows']} redaka), {seconds:.2f} s")
+        elif isinstance(sink, UpdateSink):
+            print(
+                f"[OK] {sink.name}: {summary['statements']} UPDATE statementa ({summary['fixed']} popravljenih "
+                f"vrijednosti, {summary['skipped']} redaka preskoceno bez dekodiranja), {seconds:.2f} s"
+            )
+            if summary['unparsable']:
+                print(
+                    f"[WARNING] {sink.name}: {summary['unparsable']} redaka s neispravnim escape-om preskoceno "
+                    f"(--strict prekida obradu)",
+                    file=sys.stderr,
+                )
+        else:
+            print(f"[OK] {sink.name}: {seconds:.2f} s")
+        for path in summary['output']:
+            print(f"  [OK] Spremljeno u: {path}")
+    print(f"[INFO] INSERT: {insert_repair.summary()}")
+    print(f"[INFO] UPDATE: {update_repair.summary()}")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
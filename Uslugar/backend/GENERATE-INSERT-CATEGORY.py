@@ -3,86 +3,64 @@
 """
 Skripta za generiranje INSERT statementa za Category tablicu iz backup datoteke.
 Generira INSERT statemente za SVE retke s ispravnim encodingom.
+Uz --tables radi za bilo koji popis tablica (kolone i tipovi iz dumpa).
 """
 
-import re
+import argparse
 import sys
 from pathlib import Path
 
-# Problematični znakovi koje treba popraviti
-PROBLEMATIC_PATTERNS = [
-    (r'┼ż', 'ž'), (r'┼í', 'š'), (r'┼ì', 'č'), (r'┼░', 'đ'), (r'┼ü', 'Ž'), (r'┼Ü', 'Š'),
-    (r'<\|', 'ž'), (r'\|>', 'ž'),
-    (r'Âž', 'ž'), (r'Âć', 'ć'), (r'Âč', 'č'), (r'Âđ', 'đ'), (r'Âš', 'š'), (r'ÂŽ', 'Ž'), (r'ÂĆ', 'Ć'), (r'ÂČ', 'Č'),
-    (r'─Ź', 'č'), (r'─ć', 'ć'), (r'─î', 'Č'), (r'─í', 'ć'), (r'─ì', 'č'), (r'─Ĺ', 'đ'), (r'─ç', 'ć'),
-    (r'┼á', 'š'), (r'Ôćö', '↔'), (r'Ôëą', '≥'), (r'Ôćĺ', '→'),
-    (r'ZAVRšEN', 'ZAVRŠEN'),  # CASE fix
-    (r'\\n', '\n'),  # Literalni \n -> stvarni novi red
-    # Dodatni encoding problemi - zamijeni s ASCII ekvivalentom ili ostavi ako nije poznat
-    (r'├ę', 'e'),  # Plinoinstalat├ęr -> Plinoinstalater
-    # Možda treba biti drugačije - provjeri kontekst
-]
+from backup_fix import (
+    INSERT_MODES,
+    INSERT_PATTERNS,
+    REPAIR_MODES,
+    InsertSink,
+    RepairCache,
+    RepairEngine,
+    RunStats,
+    make_repair_engine,
+    scan_dump,
+)
 
-def fix_encoding(text):
-    """Popravi encoding u tekstu - primjenjuje sve zamjene."""
-    if not text or not isinstance(text, str):
-        return text
-    result = text
-    # Primjeni sve zamjene redom
-    for pattern, replacement in PROBLEMATIC_PATTERNS:
-        result = re.sub(pattern, replacement, result)
-    return result
+# Problematični znakovi koje treba popraviti (backup_fix/patterns.py)
+PROBLEMATIC_PATTERNS = INSERT_PATTERNS
 
-def escape_sql_string(value):
-    """Escape SQL string vrijednosti."""
-    if value is None:
-        return 'NULL'
-    
-    # Zamijeni ' s ''
-    escaped = str(value).replace("'", "''")
-    
-    # Provjeri ima li novih redova, tabova ili backslash-ova
-    has_newline = '\n' in escaped
-    has_tab = '\t' in escaped
-    has_backslash = '\\' in escaped and '\\' not in ['\n', '\t', '\r']
-    
-    # Ako ima novih redova, tabova ili backslash-ova, koristi E'' syntax
-    if has_newline or has_tab or has_backslash:
-        # Prvo escape-aj postojeće backslash-ove (osim onih koji su dio \n, \t, \r)
-        # Stvarni novi red (\n) treba ostati kao \n u E'' sintaksi
-        # Ali doslovni backslash (\) treba biti escape-an kao \\
-        
-        # Zamijeni stvarni novi red s placeholder
-        escaped = escaped.replace('\n', '__NEWLINE__')
-        escaped = escaped.replace('\t', '__TAB__')
-        escaped = escaped.replace('\r', '__CR__')
-        
-        # Sada escape-aj sve doslovne backslash-ove
-        escaped = escaped.replace('\\', '\\\\')
-        
-        # Vrati nove redove kao \n u E'' sintaksi
-        escaped = escaped.replace('__NEWLINE__', '\\n')
-        escaped = escaped.replace('__TAB__', '\\t')
-        escaped = escaped.replace('__CR__', '\\r')
-        
-        return f"E'{escaped}'"
-    return f"'{escaped}'"
+# Svi uzorci kompilirani jednom - jedan prolaz po vrijednosti
+REPAIR_ENGINE = RepairEngine(PROBLEMATIC_PATTERNS)
+# Ponovljene vrijednosti se popravljaju jednom (LRU, ograničena memorija)
+REPAIR_CACHE = RepairCache(REPAIR_ENGINE)
 
-def parse_data_line(line):
-    """Parsira redak podataka (tab-separated values)."""
-    # Jednostavno split po tab-ovima
-    # U PostgreSQL COPY formatu, tab je separator između kolona
-    parts = line.split('\t')
-    
-    # Zamijeni \N s None
-    parts = [None if p == '\\N' else p for p in parts]
-    
-    # Popravi literalni \n (backslash + n) u tekstualnim vrijednostima
-    # Ovo će se popraviti u fix_encoding funkciji, ali sada zadrži kao string
-    return parts
+def process_tables_backup(
+    backup_path,
+    output_path,
+    tables,
+    split_mb=None,
+    output_mode='insert',
+    batch_size=500,
+    use_index=True,
+    stats_path=None,
+):
+    """
+    Generira INSERT statemente (ili COPY blokove) za zadane tablice iz backup datoteke.
 
-def process_category_backup(backup_path, output_path):
-    """Glavna funkcija za procesiranje Category tablice iz backup datoteke."""
+    Dump se čita s scan_dump i jednim InsertSink-om (backup_fix/fanout.py),
+    istim putem kao --insert u GENERATE-FROM-BACKUP.py.
+
+    Kolone se uzimaju iz COPY headera svake tablice, a tipovi iz CREATE TABLE
+    naredbi u dumpu (SchemaCatalog). Statementi se zapisuju odmah
+    (SqlWriter); ulaz i izlaz mogu biti .gz/.zst, a split_mb dijeli izlaz na
+    dijelove s vlastitom transakcijom. output_mode bira oblik izlaza
+    (INSERT_MODES), batch_size broj redaka po statementu za multi/upsert.
+
+    Za nekomprimirani dump koristi se indeks COPY sekcija (<dump>.index.json)
+    pa se čitaju samo CREATE TABLE naredbe i sekcije traženih tablica. Iz
+    pg_dump arhive (custom -Fc ili directory -Fd) čita se TOC i
+    dekomprimiraju se samo podaci traženih tablica.
+
+    stats_path: JSON sa statistikom obrade (retci/bajtovi/popravljeni retci
+    po tablici, popravci po koloni i uzorku, vrijeme po fazama, propusnost,
+    vršna memorija).
+    """
     backup_file = Path(backup_path)
     if not backup_file.exists():
         print(f"[ERROR] Backup datoteka ne postoji: {backup_path}", file=sys.stderr)
@@ -90,142 +68,108 @@ def process_category_backup(backup_path, output_path):
     
     print(f"[INFO] Citanje backup datoteke: {backup_path}")
     
-    # Kategorija kolone (prema COPY statementu)
-    category_columns = [
-        'id', 'name', 'description', 'parentId', 'isActive', 'createdAt',
-        'nkdCode', 'requiresLicense', 'licenseType', 'licenseAuthority', 'icon'
-    ]
-    
-    insert_statements = []
-    in_category_section = False
-    line_count = 0
-    
+    tables = list(tables)
+    stats = RunStats() if stats_path else None
+    sink = InsertSink(
+        output_path, tables, REPAIR_CACHE,
+        output_mode=output_mode, batch_size=batch_size, split_mb=split_mb, source=backup_path, stats=stats,
+    )
     try:
-        with open(backup_file, 'r', encoding='utf-8', errors='ignore') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.rstrip('\n\r')
-                
-                # Provjeri je li COPY statement za Category
-                if line.startswith('COPY public."Category"'):
-                    in_category_section = True
-                    print(f"[INFO] Pronadjen COPY statement za Category tablicu")
-                    continue
-                
-                # Provjeri je li kraj COPY bloka
-                if (line == '\\.' or line.strip() == '\\.') and in_category_section:
-                    print(f"[INFO] Kraj Category sekcije")
-                    break
-                
-                # Ako smo u Category sekciji, parsiraj podatke
-                if in_category_section and line.strip():
-                    line_count += 1
-                    
-                    # Parsiraj redak podataka
-                    try:
-                        data_parts = parse_data_line(line)
-                        
-                        if len(data_parts) != len(category_columns):
-                            print(f"[WARNING] Linija {line_num}: Očekivano {len(category_columns)} kolona, dobiveno {len(data_parts)}")
-                            continue
-                        
-                        # Popravi encoding za sve tekstualne vrijednosti
-                        fixed_parts = []
-                        for part in data_parts:
-                            if part is not None:
-                                fixed_parts.append(fix_encoding(str(part)))
-                            else:
-                                fixed_parts.append(None)
-                        
-                        # Generiraj INSERT statement
-                        # Column names - PostgreSQL koristi camelCase kolone s navodnicima
-                        # Prema COPY statementu u backup datoteci:
-                        # S navodnicima: "parentId", "isActive", "createdAt", "nkdCode", "requiresLicense", "licenseType", "licenseAuthority"
-                        # Bez navodnika: id, name, description, icon
-                        column_mapping = {
-                            'id': 'id',
-                            'name': 'name',
-                            'description': 'description',
-                            'parentId': '"parentId"',  # camelCase - trebaju navodnici
-                            'isActive': '"isActive"',  # camelCase - trebaju navodnici
-                            'createdAt': '"createdAt"',  # camelCase - trebaju navodnici
-                            'nkdCode': '"nkdCode"',  # camelCase - trebaju navodnici (u COPY ima navodnike)
-                            'requiresLicense': '"requiresLicense"',  # camelCase - trebaju navodnici (u COPY ima navodnike)
-                            'licenseType': '"licenseType"',  # camelCase - trebaju navodnici (u COPY ima navodnike)
-                            'licenseAuthority': '"licenseAuthority"',  # camelCase - trebaju navodnici (u COPY ima navodnike)
-                            'icon': 'icon'  # Bez navodnika u COPY
-                        }
-                        columns_str = ', '.join([column_mapping.get(col, col) for col in category_columns])
-                        
-                        # Values
-                        values_list = []
-                        for i, val in enumerate(fixed_parts):
-                            if val is None or val == '\\N':
-                                values_list.append('NULL')
-                            elif category_columns[i] in ['isActive', 'requiresLicense']:
-                                # Boolean
-                                values_list.append('true' if str(val).lower() == 't' else 'false')
-                            elif category_columns[i] in ['createdAt']:
-                                # Timestamp
-                                values_list.append(f"'{val}'")
-                            elif category_columns[i] in ['parentId'] and (val is None or val == '\\N'):
-                                values_list.append('NULL')
-                            elif category_columns[i] == 'nkdCode' and (val is None or val == '\\N'):
-                                values_list.append('NULL')
-                            else:
-                                # Text - koristi escape_sql_string
-                                values_list.append(escape_sql_string(val))
-                        
-                        values_str = ', '.join(values_list)
-                        
-                        insert_stmt = f'INSERT INTO public."Category" ({columns_str}) VALUES ({values_str});'
-                        insert_statements.append(insert_stmt)
-                    
-                    except Exception as e:
-                        print(f"[WARNING] Linija {line_num}: Greska pri parsiranju: {e}")
-                        continue
-    
+        run = scan_dump(backup_file, [sink], use_index=use_index)
     except Exception as e:
         print(f"[ERROR] Greska pri citanju datoteke: {e}", file=sys.stderr)
         return False
+    summary = run['sinks'][sink.name]
     
-    print(f"[OK] Procesirano {line_count} redaka")
-    print(f"[OK] Generirano {len(insert_statements)} INSERT statementa")
+    for table in summary['missing_tables']:
+        print(f"[WARNING] Tablica {table} nije pronadjena u backup datoteci")
+    print(f"[OK] Procesirano {summary['rows'] + summary['bad_rows']} redaka")
+    if output_mode == 'copy':
+        print(f"[OK] Generirano {summary['rows']} redaka u COPY blokovima")
+    else:
+        print(f"[OK] Generirano {summary['statements']} INSERT statementa ({summary['rows']} redaka)")
+    print(f"[INFO] {REPAIR_CACHE.summary()}")
+    if stats is not None:
+        stats.bytes_read = run['bytes']
+        stats.times['read'] = run['times']['read']
+        stats.write(
+            stats_path,
+            script='GENERATE-INSERT-CATEGORY.py',
+            dump=str(backup_path),
+            output=summary['output'],
+            tables_requested=tables,
+            output_mode=output_mode,
+            rows_written=summary['rows'],
+            statements=summary['statements'],
+            cache={'hits': REPAIR_CACHE.hits, 'misses': REPAIR_CACHE.misses, 'evictions': REPAIR_CACHE.evictions},
+        )
+        print(f"[OK] Statistika spremljena u: {stats_path}")
     
-    # Spremi INSERT statemente u datoteku
-    if insert_statements:
-        output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write("-- ============================================================================\n")
-            f.write("-- GENERIRANI INSERT STATEMENTI ZA CATEGORY TABLICU\n")
-            f.write("-- ============================================================================\n")
-            f.write(f"-- Izvor: {backup_path}\n")
-            f.write(f"-- Generirano: {len(insert_statements)} INSERT statementa\n")
-            f.write("-- ============================================================================\n\n")
-            f.write("BEGIN;\n\n")
-            f.write("-- Obriši postojeće podatke (opcionalno)\n")
-            f.write("-- DELETE FROM public.\"Category\";\n\n")
-            
-            for stmt in insert_statements:
-                f.write(stmt + '\n')
-            
-            f.write("\nCOMMIT;\n")
-        
-        print(f"[OK] INSERT statementi spremljeni u: {output_path}")
+    if summary['output']:
+        for path in summary['output']:
+            print(f"[OK] Statementi spremljeni u: {path}")
         return True
     else:
-        print("[INFO] Nisu pronadjeni retci za Category tablicu")
+        print(f"[INFO] Nisu pronadjeni retci za tablice: {', '.join(tables)}")
         return True
 
+def process_category_backup(backup_path, output_path, **kwargs):
+    """Glavna funkcija za procesiranje Category tablice iz backup datoteke."""
+    return process_tables_backup(backup_path, output_path, ['Category'], **kwargs)
+
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Korištenje: python GENERATE-INSERT-CATEGORY.py <backup_file> [output_file]")
-        sys.exit(1)
-    
-    backup_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else 'INSERT-CATEGORY.sql'
-    
-    success = process_category_backup(backup_file, output_file)
-    sys.exit(0 if success else 1)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('backup_file', help='Backup: pg_dump plain format (moze biti .gz/.zst), custom arhiva (-Fc) ili direktorij (-Fd)')
+    parser.add_argument('output_file', nargs='?', default='INSERT-CATEGORY.sql', help='Izlazna SQL datoteka (.gz/.zst = komprimirani izlaz)')
+    parser.add_argument(
+        '--repair-mode',
+        choices=REPAIR_MODES,
+        default='patterns',
+        help='patterns = samo PROBLEMATIC_PATTERNS, codec = generirane codec tablice + PROBLEMATIC_PATTERNS',
+    )
+    parser.add_argument(
+        '--cache-mb',
+        type=float,
+        default=64,
+        help='Memorija za cache popravljenih vrijednosti u MB (0 = bez cachea)',
+    )
+    parser.add_argument(
+        '--split-mb',
+        type=float,
+        default=None,
+        help='Podijeli izlaz na dijelove od N MB (svaki dio je zasebna transakcija)',
+    )
+    parser.add_argument(
+        '--output-mode',
+        choices=INSERT_MODES,
+        default='insert',
+        help='insert = INSERT po retku, multi = viseretcani INSERT, upsert = INSERT ... ON CONFLICT (id) DO UPDATE, copy = COPY ... FROM stdin',
+    )
+    parser.add_argument('--batch-size', type=int, default=500, help='Broj redaka po statementu za multi/upsert')
+    parser.add_argument(
+        '--tables',
+        default='Category',
+        help='Tablice za koje se generiraju INSERT-i, odvojene zarezom (default: Category)',
+    )
+    parser.add_argument(
+        '--no-index',
+        action='store_true',
+        help='Ne koristi indeks COPY sekcija (<dump>.index.json), citaj cijelu datoteku',
+    )
+    parser.add_argument('--stats', default=None, help='Spremi statistiku obrade u JSON datoteku')
+    args = parser.parse_args()
 
+    REPAIR_ENGINE = make_repair_engine(PROBLEMATIC_PATTERNS, args.repair_mode)
+    REPAIR_CACHE = RepairCache(REPAIR_ENGINE, args.cache_mb)
+
+    success = process_tables_backup(
+        args.backup_file,
+        args.output_file,
+        [table.strip() for table in args.tables.split(',') if table.strip()],
+        split_mb=args.split_mb,
+        output_mode=args.output_mode,
+        batch_size=args.batch_size,
+        use_index=not args.no_index,
+        stats_path=args.stats,
+    )
+    sys.exit(0 if success else 1)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Zajednička logika za skripte koje obrađuju backup datoteke
+(GENERATE-UPDATE-FROM-BACKUP.py, GENERATE-INSERT-CATEGORY.py,
+GENERATE-FROM-BACKUP.py).
+"""
+
+from .apply import FixApplier
+from .checkpoint import Checkpoint, checkpoint_path
+from .copy_format import (
+    LinePrefilter,
+    decode_copy_line,
+    encode_copy_line,
+    parse_copy_statement,
+    unescape_copy_field,
+)
+from .dump_index import (
+    build_dump_index,
+    dump_fingerprint,
+    iter_dump_lines,
+    iter_dump_positions,
+    iter_range_lines,
+    load_dump_index,
+    split_section,
+)
+from .dump_io import SqlWriter, open_dump, open_dump_text
+from .fanout import (
+    DumpRow,
+    InsertSink,
+    Sink,
+    StatsSink,
+    UpdateSink,
+    scan_dump,
+    scan_lines,
+    wanted_tables,
+)
+from .patterns import INSERT_PATTERNS, UPDATE_PATTERNS
+from .pg_archive import (
+    archive_sections,
+    has_data_positions,
+    is_pg_archive,
+    iter_archive_positions,
+    iter_section_lines,
+    read_archive,
+)
+from .repair import (
+    REPAIR_MODES,
+    CodecRepairEngine,
+    CodecTable,
+    RepairCache,
+    RepairEngine,
+    build_codec_table,
+    load_codec_table,
+    make_repair_engine,
+)
+from .row_fingerprints import (
+    RowFingerprints,
+    build_row_fingerprints,
+    load_row_fingerprints,
+    row_fingerprint,
+    row_fingerprints_path,
+)
+from .schema import BOOLEAN_TYPES, TEXT_TYPES, SchemaCatalog
+from .stats import RunStats
+from .sql_format import (
+    INSERT_MODES,
+    UPDATE_MODES,
+    InsertBuilder,
+    UpdateBuilder,
+    escape_sql_string,
+    format_sql_values,
+    quote_identifier,
+    update_statement,
+)
+
+__all__ = [
+    'BOOLEAN_TYPES',
+    'REPAIR_MODES',
+    'Checkpoint',
+    'CodecRepairEngine',
+    'CodecTable',
+    'DumpRow',
+    'FixApplier',
+    'INSERT_MODES',
+    'INSERT_PATTERNS',
+    'InsertBuilder',
+    'InsertSink',
+    'LinePrefilter',
+    'RepairCache',
+    'RepairEngine',
+    'RowFingerprints',
+    'RunStats',
+    'SchemaCatalog',
+    'Sink',
+    'SqlWriter',
+    'StatsSink',
+    'TEXT_TYPES',
+    'UPDATE_MODES',
+    'UPDATE_PATTERNS',
+    'UpdateBuilder',
+    'UpdateSink',
+    'archive_sections',
+    'build_codec_table',
+    'build_dump_index',
+    'build_row_fingerprints',
+    'checkpoint_path',
+    'decode_copy_line',
+    'dump_fingerprint',
+    'encode_copy_line',
+    'escape_sql_string',
+    'format_sql_values',
+    'has_data_positions',
+    'is_pg_archive',
+    'iter_archive_positions',
+    'iter_dump_lines',
+    'iter_dump_positions',
+    'iter_range_lines',
+    'iter_section_lines',
+    'load_codec_table',
+    'load_dump_index',
+    'load_row_fingerprints',
+    'make_repair_engine',
+    'open_dump',
+    'open_dump_text',
+    'parse_copy_statement',
+    'quote_identifier',
+    'read_archive',
+    'row_fingerprint',
+    'row_fingerprints_path',
+    'scan_dump',
+    'scan_lines',
+    'split_section',
+    'unescape_copy_field',
+    'update_statement',
+    'wanted_tables',
+]
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark za backup_fix.
+
+Pokretanje (iz Uslugar/backend):
+    python -m backup_fix.bench [--rows N] [--escape-ratio 0.2]
+        mikro-benchmark COPY dekodera
+    python -m backup_fix.bench scripts [--size-mb 50] [opcije generatora] [--results bench-results.json]
+        sintetički dump (backup_fix.synthetic) kroz GENERATE-UPDATE-FROM-BACKUP.py
+        i GENERATE-INSERT-CATEGORY.py: redaka/s, MB/s, vršna memorija, broj statementa
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .copy_format import decode_copy_line
+from .synthetic import add_generator_arguments, generate_dump, generator_kwargs
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SCRIPTS = {
+    'update': BACKEND_DIR / 'GENERATE-UPDATE-FROM-BACKUP.py',
+    'insert': BACKEND_DIR / 'GENERATE-INSERT-CATEGORY.py',
+}
+
+_GENERATED_RE = re.compile(r'\[OK\] Generirano (\d+)')
+
+
+def _legacy_parse_data_line(line):
+    """Stara petlja znak po znak iz GENERATE-UPDATE-FROM-BACKUP.py (referenca za usporedbu)."""
+    parts = []
+    current = []
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if char == '\\':
+            if i + 1 < len(line):
+                next_char = line[i + 1]
+                if next_char == 'N':
+                    if current:
+                        parts.append(''.join(current))
+                        current = []
+                    parts.append('\\N')
+                    i += 2
+                    continue
+                elif next_char == 'n':
+                    current.append('\\')
+                    current.append('n')
+                    i += 2
+                    continue
+                elif next_char == 't':
+                    current.append('\\')
+                    current.append('t')
+                    i += 2
+                    continue
+                elif next_char == '\\':
+                    current.append('\\')
+                    i += 2
+                    continue
+            current.append('\\')
+            i += 1
+        elif char == '\t':
+            parts.append(''.join(current))
+            current = []
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+    if current:
+        parts.append(''.join(current))
+    return [None if p == '\\N' else p for p in parts]
+
+
+def make_copy_rows(count, escape_ratio=0.2, seed=1):
+    """Sintetički COPY retci: uuid, naziv, opis, timestamp, NULL-ovi, dio s escape-ovima."""
+    rng = random.Random(seed)
+    words = ['Vodoinstalater', 'Električar', 'popravak', 'kupaonice', 'Zagreb', 'ponuda', 'hitno', 'usluga']
+    rows = []
+    for n in range(count):
+        description = ' '.join(rng.choice(words) for _ in range(rng.randint(5, 25)))
+        fields = [
+            f'{n:08x}-0000-4000-8000-{rng.getrandbits(48):012x}',
+            rng.choice(words),
+            description,
+            '2024-05-01 12:00:00.000',
+            't' if n % 2 else 'f',
+        ]
+        if rng.random() < escape_ratio:
+            fields[2] = fields[2].replace(' ponuda ', '\\nponuda\\t') + ' C:\\\\temp'
+            fields.append('\\N')
+        else:
+            fields.append(str(rng.randint(1, 1000)))
+        rows.append('\t'.join(fields))
+    return rows
+
+
+def _rows_per_second(func, rows, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for row in rows:
+            func(row)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(rows) / best if best else float('inf')
+
+
+def bench_copy_decoder(rows):
+    """Usporedi decode_copy_line sa starom petljom znak po znak."""
+    legacy = _rows_per_second(_legacy_parse_data_line, rows)
+    current = _rows_per_second(decode_copy_line, rows)
+    return {'legacy_rows_per_s': legacy, 'decoder_rows_per_s': current, 'speedup': current / legacy}
+
+
+def _run_measured(cmd):
+    """
+    Pokreni proces i vrati (izlaz, sekunde, vršni RSS u MB).
+    Vršni RSS dolazi iz os.wait4 (samo za taj proces); na Windowsu je None.
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=BACKEND_DIR)
+    output = proc.stdout.read().decode('utf-8', errors='replace')
+    peak_mb = None
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss je u KB na Linuxu, u bajtovima na macOS-u
+        peak_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    else:
+        proc.wait()
+    proc.stdout.close()
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(map(str, cmd))} zavrsio s kodom {proc.returncode}:\n{output}")
+    return output, elapsed, peak_mb
+
+
+def bench_scripts(dump_info, work_dir, script_args=None, repeat=1):
+    """
+    Pokreni skripte nad dumpom i izmjeri ih (najbolje od `repeat` pokretanja).
+    script_args: {'update': [...], 'insert': [...]} dodatni argumenti.
+    """
+    script_args = script_args or {}
+    dump_path = dump_info['path']
+    size_mb = dump_info['bytes'] / (1024 * 1024)
+    tables = ','.join(dump_info['tables'])
+    results = {}
+    for name, script in SCRIPTS.items():
+        output_path = Path(work_dir) / f'{name}.sql'
+        cmd = [sys.executable, str(script), dump_path, str(output_path)]
+        if name == 'insert':
+            cmd += ['--tables', tables]
+        cmd += script_args.get(name, [])
+
+        best = None
+        for _ in range(repeat):
+            output, elapsed, peak_mb = _run_measured(cmd)
+            if best is None or elapsed < best[1]:
+                best = (output, elapsed, peak_mb)
+        output, elapsed, peak_mb = best
+        match = _GENERATED_RE.search(output)
+        results[name] = {
+            'args': cmd[4:],
+            'seconds': elapsed,
+            'rows_per_s': dump_info['rows'] / elapsed,
+            'mb_per_s': size_mb / elapsed,
+            'peak_rss_mb': peak_mb,
+            'statements': int(match.group(1)) if match else None,
+        }
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_results(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _print_results(results, previous=None):
+    for name, result in results.items():
+        peak = f"{result['peak_rss_mb']:.0f} MB" if result['peak_rss_mb'] is not None else '-'
+        line = (
+            f"[BENCH] {name:<7} {result['rows_per_s']:>10,.0f} redaka/s  {result['mb_per_s']:>7.1f} MB/s  "
+            f"RSS {peak:>7}  {result['statements']} statementa"
+        )
+        old = (previous or {}).get(name)
+        if old:
+            change = (result['rows_per_s'] / old['rows_per_s'] - 1) * 100
+            line += f"  ({change:+.1f}% u odnosu na prethodni)"
+        print(line)
+
+
+def run_scripts_benchmark(args):
+    params = generator_kwargs(args)
+    script_args = {'update': shlex.split(args.update_args), 'insert': shlex.split(args.insert_args)}
+    with tempfile.TemporaryDirectory(prefix='backup_fix_bench_') as tmp:
+        work_dir = Path(args.keep) if args.keep else Path(tmp)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        dump_info = generate_dump(work_dir / 'dump.sql', **params)
+        print(
+            f"[BENCH] Dump: {dump_info['bytes'] / (1024 * 1024):.1f} MB, {dump_info['rows']} redaka, "
+            f"{dump_info['mojibake_values']} oštećenih vrijednosti"
+        )
+        results = bench_scripts(dump_info, work_dir, script_args, args.repeat)
+
+    run = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'params': dict(params, script_args=script_args),
+        'dump': {key: dump_info[key] for key in ('bytes', 'rows', 'tables', 'mojibake_values')},
+        'results': results,
+    }
+    history = _load_results(args.results) if args.results else []
+    # Usporedba s zadnjim pokretanjem s istim parametrima
+    previous = next((old['results'] for old in reversed(history) if old.get('params') == run['params']), None)
+    _print_results(results, previous)
+    if args.results:
+        history.append(run)
+        with open(args.results, 'w', encoding='utf-8') as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+        print(f"[BENCH] Rezultat dodan u {args.results}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark backup_fix (COPY dekoder ili cijele skripte)')
+    parser.add_argument('mode', nargs='?', choices=('decoder', 'scripts'), default='decoder')
+    parser.add_argument('--rows', type=int, default=50000, help='decoder: broj sintetičkih redaka')
+    add_generator_arguments(parser, escape_ratio=0.2)
+    parser.add_argument('--update-args', default='', help='scripts: dodatni argumenti za GENERATE-UPDATE-FROM-BACKUP.py')
+    parser.add_argument('--insert-args', default='', help='scripts: dodatni argumenti za GENERATE-INSERT-CATEGORY.py')
+    parser.add_argument('--repeat', type=int, default=1, help='scripts: broj pokretanja (uzima se najbrže)')
+    parser.add_argument('--results', default=None, help='scripts: JSON datoteka u koju se dodaje rezultat')
+    parser.add_argument('--keep', default=None, help='scripts: mapa za dump i izlaz (inače privremena)')
+    args = parser.parse_args()
+
+    if args.mode == 'scripts':
+        run_scripts_benchmark(args)
+        return
+
+    rows = make_copy_rows(args.rows, args.escape_ratio)
+    result = bench_copy_decoder(rows)
+    print(f"[BENCH] per-char petlja:  {result['legacy_rows_per_s']:>12,.0f} redaka/s")
+    print(f"[BENCH] decode_copy_line: {result['decoder_rows_per_s']:>12,.0f} redaka/s")
+    print(f"[BENCH] ubrzanje: {result['speedup']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoint za nastavak prekinute obrade dumpa.
+
+Stanje (pozicija u dumpu, trenutna COPY tablica, brojači, stanje izlazne
+datoteke...) sprema se periodički u JSON pored izlaza
+(<izlaz>.checkpoint.json). Zapis je atomski (privremena datoteka +
+os.replace) pa prekid usred spremanja ostavlja prethodni checkpoint.
+"""
+
+import json
+import os
+from pathlib import Path
+
+CHECKPOINT_VERSION = 2
+
+
+def checkpoint_path(output_path):
+    return Path(str(output_path) + '.checkpoint.json')
+
+
+class Checkpoint:
+    """
+    Periodički checkpoint: due() javlja kad je od zadnjeg spremanja
+    obrađeno barem every_rows redaka (every_rows=0 isključuje spremanje).
+    """
+
+    def __init__(self, path, every_rows=100000):
+        self.path = Path(path)
+        self.every_rows = every_rows
+        self._last_rows = 0
+
+    def due(self, rows):
+        return bool(self.every_rows) and rows - self._last_rows >= self.every_rows
+
+    def load(self):
+        """Spremljeno stanje ili None (nema checkpointa ili je neispravan)."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('version') != CHECKPOINT_VERSION:
+            return None
+        self._last_rows = state.get('counts', {}).get('rows', 0)
+        return state
+
+    def save(self, state, rows):
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(dict(state, version=CHECKPOINT_VERSION), f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._last_rows = rows
+
+    def clear(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
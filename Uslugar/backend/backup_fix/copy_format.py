@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Obrada redaka iz PostgreSQL COPY blokova (pg_dump plain format).
+"""
+
+import re
+
+_COPY_STATEMENT_RE = re.compile(r'COPY\s+public\.?"?([^"]+)"?\s*\(([^)]+)\)\s+FROM\s+stdin;')
+
+
+def parse_copy_statement(line):
+    """
+    Parsira COPY statement i vraća (tablica, kolone) ili (None, None).
+
+    Format: COPY public."TableName" (col1, "col2", ...) FROM stdin;
+    """
+    match = _COPY_STATEMENT_RE.match(line)
+    if match:
+        return match.group(1).strip('"'), [col.strip().strip('"') for col in match.group(2).split(',')]
+    return None, None
+
+
+class LinePrefilter:
+    """
+    Brza provjera sirovog retka (bytes) prije dekodiranja i parsiranja.
+
+    Redak koji je čisti ASCII, bez backslash-a i bez ASCII uzoraka iz
+    enginea (npr. '<|') ne može dati popravak pa se preskače bez
+    dekodiranja i split-a po tabovima.
+    """
+
+    def __init__(self, engine):
+        # Uzorci s backslash-om su već pokriveni provjerom b'\\'
+        self._triggers = tuple(
+            lit.encode('ascii') for lit in engine.ascii_literals() if '\\' not in lit
+        )
+
+    def __call__(self, raw):
+        """True ako redak treba dekodirati i provjeriti."""
+        if not raw.isascii() or b'\\' in raw:
+            return True
+        for trigger in self._triggers:
+            if trigger in raw:
+                return True
+        return False
+
+
+# Escape sekvence COPY text formata koje daju jedan znak
+_SIMPLE_ESCAPES = {
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+    'v': '\v',
+}
+
+# \ + bilo koji znak (ostali znakovi predstavljaju sami sebe, npr. \\ -> \)
+_ESCAPE_RE = re.compile(r'\\(.)', re.S)
+
+# Oktalni (\1 - \377) i heksadecimalni (\x1 - \xff) escape-ovi su bajtovi
+# u encodingu baze pa se dekodiraju na razini bajtova
+_BYTE_ESCAPE_PROBE = re.compile(r'\\(?:[0-7]|x[0-9A-Fa-f])')
+_BYTE_ESCAPE_RE = re.compile(rb'\\(?:([0-7]{1,3})|x([0-9A-Fa-f]{1,2})|(.))', re.S)
+
+
+def _simple_escape(match):
+    char = match.group(1)
+    return _SIMPLE_ESCAPES.get(char, char)
+
+
+def _byte_escape(match):
+    octal, hexa, char = match.groups()
+    if octal is not None:
+        return bytes((int(octal, 8) & 0xFF,))
+    if hexa is not None:
+        return bytes((int(hexa, 16),))
+    if char.isascii():
+        key = char.decode('ascii')
+        return _SIMPLE_ESCAPES.get(key, key).encode('ascii')
+    return char
+
+
+def unescape_copy_field(field, encoding='utf-8'):
+    """Dekodiraj jedno polje COPY text formata (bez provjere za \\N)."""
+    if '\\' not in field:
+        return field
+    if _BYTE_ESCAPE_PROBE.search(field) is None:
+        return _ESCAPE_RE.sub(_simple_escape, field)
+    raw = _BYTE_ESCAPE_RE.sub(_byte_escape, field.encode(encoding))
+    return raw.decode(encoding)
+
+
+def _join_escaped_tabs(parts):
+    """Spoji dijelove split('\\t') gdje je tab escape-an (neparan broj backslash-a ispred)."""
+    fields = [parts[0]]
+    for part in parts[1:]:
+        last = fields[-1]
+        if (len(last) - len(last.rstrip('\\'))) % 2:
+            fields[-1] = f'{last}\t{part}'
+        else:
+            fields.append(part)
+    return fields
+
+
+def decode_copy_line(line, encoding='utf-8'):
+    """
+    Parsiraj redak podataka iz COPY bloka (PostgreSQL text format).
+
+    Tab je separator, \\N je NULL (None), a escape sekvence \\b \\f \\n \\r
+    \\t \\v, \\\\, oktalni (\\ooo) i heksadecimalni (\\xhh) bajtovi se
+    dekodiraju. Redak bez backslash-a ne može imati escape ni NULL pa ide
+    ravno kroz str.split.
+
+    Kao i PostgreSQL, backslash escape-a i stvarni tab: \\<TAB> je tab
+    unutar polja, a ne separator (pg_dump tab uvijek piše kao \\t).
+    """
+    if '\\' not in line:
+        return line.split('\t')
+    parts = line.split('\t')
+    if '\\\t' in line:
+        parts = _join_escaped_tabs(parts)
+    for i, field in enumerate(parts):
+        if '\\' in field:
+            parts[i] = None if field == '\\N' else unescape_copy_field(field, encoding)
+    return parts
+
+
+# Obrnuto od decode_copy_line: znakovi koji se u COPY text formatu escape-aju
+_COPY_ENCODE_TABLE = str.maketrans({
+    '\\': '\\\\',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\t': '\\t',
+    '\b': '\\b',
+    '\f': '\\f',
+    '\v': '\\v',
+})
+
+
+def encode_copy_line(values):
+    """Složi redak za COPY ... FROM stdin (None -> \\N)."""
+    return '\t'.join('\\N' if value is None else str(value).translate(_COPY_ENCODE_TABLE) for value in values)
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Indeks COPY sekcija u pg_dump datoteci (plain format, nekomprimirano).
+
+Jednokratni prolaz kroz memory-mapped datoteku bilježi za svaki
+COPY ... FROM stdin blok raspon bajtova, broj redaka i header kolona, te
+raspone CREATE TABLE naredbi (za SchemaCatalog). Indeks se sprema pored
+dumpa (<dump>.index.json) i vrijedi dok se ne promijene veličina, mtime
+ili hash početka/kraja datoteke. Sljedeća pokretanja čitaju samo tražene
+raspone umjesto cijele datoteke.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+
+from .copy_format import parse_copy_statement
+from .dump_io import open_dump
+from .pg_archive import archive_toc_path, is_pg_archive, iter_archive_positions
+
+INDEX_VERSION = 1
+
+# Koliko bajtova s početka i kraja ulazi u hash (cijeli hash bi bio skup kao scan)
+_HASH_SAMPLE = 1024 * 1024
+_COUNT_CHUNK = 64 * 1024 * 1024
+
+
+def index_path(dump_path):
+    return Path(str(dump_path) + '.index.json')
+
+
+def dump_fingerprint(path):
+    """
+    Veličina, mtime i hash početka/kraja - ključ za indeks i checkpoint.
+    Za directory arhivu uzima se toc.dat.
+    """
+    path = archive_toc_path(path)
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read(_HASH_SAMPLE))
+        if stat.st_size > _HASH_SAMPLE:
+            f.seek(max(_HASH_SAMPLE, stat.st_size - _HASH_SAMPLE))
+            digest.update(f.read(_HASH_SAMPLE))
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+
+def _count_newlines(mm, start, end):
+    count = 0
+    for pos in range(start, end, _COUNT_CHUNK):
+        count += mm[pos:min(end, pos + _COUNT_CHUNK)].count(b'\n')
+    return count
+
+
+def _line_starts(mm, needle):
+    """Pozicije redaka koji počinju s `needle`."""
+    if mm[:len(needle)] == needle:
+        yield 0
+    pos = mm.find(b'\n' + needle)
+    while pos != -1:
+        yield pos + 1
+        pos = mm.find(b'\n' + needle, pos + 1)
+
+
+def _find_copy_end(mm, data_start):
+    """Početak retka '\\.' koji zatvara COPY blok (ili kraj datoteke)."""
+    if mm[data_start:data_start + 2] == b'\\.':
+        return data_start
+    pos = mm.find(b'\n\\.', data_start - 1)
+    while pos != -1:
+        after = mm[pos + 3:pos + 4]
+        if after in (b'\n', b'\r', b''):
+            return pos + 1
+        pos = mm.find(b'\n\\.', pos + 1)
+    return len(mm)
+
+
+def build_dump_index(dump_path):
+    """Napravi indeks (dict) za nekomprimirani dump."""
+    entries = []
+    with open(dump_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return {'version': INDEX_VERSION, 'sections': [], 'schema': []}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start in _line_starts(mm, b'CREATE TABLE '):
+                line_end = mm.find(b'\n', start)
+                line_end = size if line_end == -1 else line_end
+                if mm[start:line_end].rstrip(b'\r').endswith(b');'):
+                    end = line_end
+                else:
+                    end = mm.find(b'\n)', start)
+                    end = size if end == -1 else mm.find(b'\n', end + 1)
+                    end = size if end == -1 else end
+                end = min(size, end + 1)
+                entries.append({'kind': 'schema', 'start': start, 'end': end})
+
+            for start in _line_starts(mm, b'COPY '):
+                header_end = mm.find(b'\n', start)
+                if header_end == -1:
+                    continue
+                header = mm[start:header_end].rstrip(b'\r').decode('utf-8', errors='ignore')
+                table, columns = parse_copy_statement(header)
+                data_start = header_end + 1
+                data_end = _find_copy_end(mm, data_start)
+                marker_end = mm.find(b'\n', data_end)
+                entries.append({
+                    'kind': 'copy',
+                    'table': table,
+                    'columns': columns,
+                    'header': header,
+                    'start': start,
+                    'data_start': data_start,
+                    'data_end': data_end,
+                    'end': size if marker_end == -1 else marker_end + 1,
+                    'rows': _count_newlines(mm, data_start, data_end),
+                })
+
+            # Brojevi redaka (za poruke) - newline-ovi između uzastopnih raspona
+            entries.sort(key=lambda e: e['start'])
+            line, pos = 1, 0
+            for entry in entries:
+                line += _count_newlines(mm, pos, entry['start'])
+                pos = entry['start']
+                entry['line'] = line
+
+    return {
+        'version': INDEX_VERSION,
+        'schema': [e for e in entries if e['kind'] == 'schema'],
+        'sections': [e for e in entries if e['kind'] == 'copy'],
+    }
+
+
+def load_dump_index(dump_path, rebuild=False):
+    """
+    Učitaj indeks iz sidecar datoteke ili ga izgradi i spremi.
+    Za komprimirane dumpove i pg_dump arhive vraća None (nema mmap-a ni
+    seek-a; arhiva ima vlastiti TOC).
+    """
+    if Path(dump_path).suffix.lower() in ('.gz', '.zst') or is_pg_archive(dump_path):
+        return None
+    key = dump_fingerprint(dump_path)
+    sidecar = index_path(dump_path)
+    if not rebuild:
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('key') == key and cached.get('version') == INDEX_VERSION:
+                return cached
+        except (OSError, ValueError):
+            pass
+
+    index = build_dump_index(dump_path)
+    index['key'] = key
+    try:
+        tmp = sidecar.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp, sidecar)
+    except OSError:
+        pass
+    return index
+
+
+def _iter_range(f, start, end, first_line):
+    if start >= end:
+        return
+    f.seek(start)
+    pos = start
+    line_num = first_line
+    for raw in f:
+        yield line_num, pos, raw
+        pos += len(raw)
+        line_num += 1
+        if pos >= end:
+            break
+
+
+def iter_range_lines(dump_path, start, end, first_line):
+    """(broj retka, sirovi redak) za raspon bajtova [start, end) koji počinje na početku retka."""
+    with open(dump_path, 'rb') as f:
+        for line_num, _, raw in _iter_range(f, start, end, first_line):
+            yield line_num, raw
+
+
+def split_section(dump_path, section, chunk_bytes):
+    """
+    Podijeli podatke COPY sekcije na raspone od ~chunk_bytes poravnate na
+    početak retka: [(start, end, broj prvog retka)]. Sekcija manja od
+    chunk_bytes ostaje jedan raspon.
+    """
+    start, end = section['data_start'], section['data_end']
+    first_line = section['line'] + 1
+    if end - start <= chunk_bytes:
+        return [(start, end, first_line)]
+    chunks = []
+    with open(dump_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while start < end:
+            cut = mm.find(b'\n', min(end, start + chunk_bytes) - 1, end)
+            cut = end if cut == -1 else cut + 1
+            chunks.append((start, cut, first_line))
+            first_line += _count_newlines(mm, start, cut)
+            start = cut
+    return chunks
+
+
+def _skip_bytes(f, count):
+    """Preskoči count bajtova (komprimirani ulaz nema pravi seek)."""
+    while count > 0:
+        data = f.read(min(count, _COUNT_CHUNK))
+        if not data:
+            break
+        count -= len(data)
+
+
+def iter_dump_positions(dump_path, tables=None, use_index=True, start=0, first_line=1):
+    """
+    (broj retka, pozicija u bajtovima, sirovi redak) kroz dump, od pozicije
+    `start` (početak retka broj `first_line`) - za nastavak prekinute obrade.
+    Pozicija je u nekomprimiranom sadržaju i za .gz/.zst; custom/directory
+    arhiva čita se kao plain dump (pg_archive.iter_archive_positions).
+    """
+    if is_pg_archive(dump_path):
+        yield from iter_archive_positions(dump_path, tables=tables, start=start)
+        return
+    index = load_dump_index(dump_path) if use_index else None
+    if index is None:
+        with open_dump(dump_path) as f:
+            if start:
+                if Path(dump_path).suffix.lower() in ('.gz', '.zst'):
+                    _skip_bytes(f, start)
+                else:
+                    f.seek(start)
+            pos = start
+            for line_num, raw in enumerate(f, first_line):
+                yield line_num, pos, raw
+                pos += len(raw)
+        return
+
+    wanted = set(tables) if tables else None
+    ranges = list(index['schema'])
+    ranges.extend(
+        s for s in index['sections']
+        if s['table'] and (wanted is None or s['table'] in wanted)
+    )
+    ranges.sort(key=lambda e: e['start'])
+    with open(dump_path, 'rb') as f:
+        done = start
+        for entry in ranges:
+            if entry['end'] <= done:
+                continue
+            if entry['start'] < done:
+                # Preklapanje s već pročitanim rasponom se preskače; raspon
+                # u kojem je `start` čita se od te pozicije
+                if done != start:
+                    continue
+                yield from _iter_range(f, start, entry['end'], first_line)
+            else:
+                yield from _iter_range(f, entry['start'], entry['end'], entry['line'])
+            done = entry['end']
+
+
+def iter_dump_lines(dump_path, tables=None, use_index=True):
+    """
+    (broj retka, sirovi redak) kroz dump.
+
+    S indeksom se čitaju samo CREATE TABLE rasponi i COPY sekcije traženih
+    tablica (tables=None: sve tablice koje parse_copy_statement prepoznaje),
+    redom kako su u datoteci. Bez indeksa (ili za .gz/.zst) čita se cijela
+    datoteka. Iz pg_dump arhive (custom/directory) čitaju se samo podaci
+    traženih tablica.
+    """
+    for line_num, _, raw in iter_dump_positions(dump_path, tables=tables, use_index=use_index):
+        yield line_num, raw
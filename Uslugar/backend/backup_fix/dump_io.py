@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Čitanje backup datoteka i streaming zapis generiranog SQL-a.
+
+Ulaz i izlaz mogu biti komprimirani (.gz ili .zst - zstd traži paket
+`zstandard`). SqlWriter zapisuje statemente čim nastanu, a opcionalno
+dijeli izlaz na dijelove od N MB od kojih je svaki zasebna transakcija.
+"""
+
+import gzip
+import io
+import os
+import re
+from pathlib import Path
+
+SEPARATOR = "-- ============================================================================\n"
+
+# Širina rezervirana za broj statementa u zaglavlju (dopunjava se na kraju)
+_COUNT_WIDTH = 40
+
+
+def _compression(path):
+    suffix = Path(path).suffix.lower()
+    if suffix == '.gz':
+        return 'gz'
+    if suffix == '.zst':
+        return 'zst'
+    return None
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Za .zst datoteke potreban je paket zstandard (pip install zstandard)")
+    return zstandard
+
+
+def open_dump(path):
+    """Otvori backup datoteku za binarno čitanje (.sql, .sql.gz, .sql.zst)."""
+    kind = _compression(path)
+    if kind == 'gz':
+        return gzip.open(path, 'rb')
+    if kind == 'zst':
+        zstandard = _zstandard()
+        raw = open(path, 'rb')
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True))
+    return open(path, 'rb')
+
+
+def open_dump_text(path, newline=None):
+    """
+    Otvori backup datoteku kao tekst (UTF-8, neispravni bajtovi se izbacuju).
+    newline='\\n' dijeli samo na \\n - samostalni \\r ostaje dio retka.
+    """
+    return io.TextIOWrapper(open_dump(path), encoding='utf-8', errors='ignore', newline=newline)
+
+
+def _open_output(path):
+    kind = _compression(path)
+    if kind == 'gz':
+        return gzip.open(path, 'wb')
+    if kind == 'zst':
+        zstandard = _zstandard()
+        return zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+    return open(path, 'wb')
+
+
+def _split_name(path):
+    """UPDATE.sql.gz -> ('UPDATE', '.sql.gz')"""
+    suffixes = ''.join(path.suffixes[-2:]) if _compression(path) else path.suffix
+    stem = path.name[:-len(suffixes)] if suffixes else path.name
+    return stem, suffixes
+
+
+def part_path(output_path, part):
+    """UPDATE.sql -> UPDATE.part001.sql, UPDATE.sql.gz -> UPDATE.part001.sql.gz"""
+    path = Path(output_path)
+    stem, suffixes = _split_name(path)
+    return path.with_name(f"{stem}.part{part:03d}{suffixes}")
+
+
+def _existing_parts(output_path):
+    """Postojeće datoteke dijelova za output_path (part_path), redom po broju dijela."""
+    path = Path(output_path)
+    stem, suffixes = _split_name(path)
+    pattern = re.compile(re.escape(stem) + r'\.part(\d{3,})' + re.escape(suffixes))
+    if not path.parent.is_dir():
+        return []
+    parts = []
+    for candidate in path.parent.iterdir():
+        match = pattern.fullmatch(candidate.name)
+        if match:
+            parts.append((int(match.group(1)), candidate))
+    return [candidate for _, candidate in sorted(parts)]
+
+
+class SqlWriter:
+    """
+    Streaming zapis SQL statementa u jednu ili više datoteka.
+
+    Datoteka se otvara tek kod prvog statementa (bez statementa nema ni
+    datoteke). Svaka datoteka ima zaglavlje, BEGIN; i COMMIT;. Broj
+    statementa u zaglavlju dopunjava se na kraju; kod komprimiranog
+    izlaza (bez seek-a) broj se zapisuje u podnožje.
+
+    body_prefix/body_suffix omataju statemente u svakom dijelu (npr.
+    COPY ... FROM stdin; i \\.).
+
+    Kod dijeljenja se pri otvaranju prvog dijela brišu dijelovi ranije
+    obrade istog izlaza - inače bi obrada s manje dijelova ostavila stare
+    .partNNN datoteke koje bi se učitale uz nove.
+    """
+
+    def __init__(self, output_path, title, source, noun, preamble='', split_mb=None,
+                 body_prefix='', body_suffix=''):
+        self.output_path = Path(output_path)
+        self.title = title
+        self.source = source
+        self.noun = noun
+        self.preamble = preamble
+        self.body_prefix = body_prefix
+        self.body_suffix = body_suffix
+        self.split_bytes = int(split_mb * 1024 * 1024) if split_mb else None
+        self.count = 0
+        self.paths = []
+        self._file = None
+        self._part = 0
+        self._part_count = 0
+        self._part_bytes = 0
+        self._count_offset = None
+        self._seekable = _compression(self.output_path) is None
+
+    def _write(self, text):
+        data = text.encode('utf-8')
+        self._file.write(data)
+        self._part_bytes += len(data)
+
+    def _open_part(self):
+        self._part += 1
+        if self.split_bytes and self._part == 1:
+            for stale in _existing_parts(self.output_path):
+                stale.unlink()
+        path = part_path(self.output_path, self._part) if self.split_bytes else self.output_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = _open_output(path)
+        self.paths.append(path)
+        self._part_count = 0
+        self._part_bytes = 0
+
+        self._write(SEPARATOR)
+        self._write(f"-- {self.title}\n")
+        self._write(SEPARATOR)
+        self._write(f"-- Izvor: {self.source}\n")
+        if self.split_bytes:
+            self._write(f"-- Dio: {self._part}\n")
+        if self._seekable:
+            self._write("-- Generirano: ")
+            self._count_offset = self._part_bytes
+            self._write(' ' * _COUNT_WIDTH + "\n")
+        else:
+            self._write("-- Generirano: vidi kraj datoteke\n")
+        self._write(SEPARATOR + "\n")
+        self._write("BEGIN;\n\n")
+        if self.preamble:
+            self._write(self.preamble)
+        if self.body_prefix:
+            self._write(self.body_prefix)
+
+    def _close_part(self, complete=True):
+        if self.body_suffix:
+            self._write(self.body_suffix)
+        if complete:
+            self._write("\nCOMMIT;\n")
+        else:
+            self._write("\n-- PREKINUTO: izlaz nije potpun, transakcija nije potvrđena\n")
+        if not self._seekable:
+            self._write(f"-- Generirano: {self._part_count} {self.noun}\n")
+        elif self._count_offset is not None:
+            self._file.seek(self._count_offset)
+            self._file.write(f"{self._part_count} {self.noun}".ljust(_COUNT_WIDTH).encode('utf-8'))
+        self._file.close()
+        self._file = None
+
+    def set_body(self, body_prefix='', body_suffix=''):
+        """
+        Promijeni omotač statementa (npr. COPY blok za sljedeću tablicu).
+        Ako je datoteka otvorena, trenutni blok se zatvara i otvara novi.
+        """
+        if self._file is not None:
+            if self.body_suffix:
+                self._write(self.body_suffix)
+            if body_prefix:
+                self._write(body_prefix)
+        self.body_prefix = body_prefix
+        self.body_suffix = body_suffix
+
+    def write(self, statement):
+        """Zapiši jedan statement (otvara novu datoteku/dio po potrebi)."""
+        if self._file is None:
+            self._open_part()
+        self._write(statement + '\n')
+        self.count += 1
+        self._part_count += 1
+        if self.split_bytes and self._part_bytes >= self.split_bytes:
+            self._close_part()
+
+    def checkpoint(self):
+        """
+        Stanje za nastavak prekinutog zapisa (vidi restore()). Zapisano se
+        prije toga sprema na disk. Komprimirani izlaz se ne može nastaviti.
+        """
+        if not self._seekable:
+            raise RuntimeError("Nastavak zapisa nije moguć za komprimirani izlaz (.gz/.zst)")
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return {
+            'part': self._part,
+            'paths': [str(path) for path in self.paths],
+            'count': self.count,
+            'part_count': self._part_count,
+            'part_bytes': self._part_bytes,
+            'count_offset': self._count_offset,
+            'open': self._file is not None,
+        }
+
+    def restore(self, state):
+        """Nastavi zapis od checkpoint() stanja - sve zapisano nakon njega se odbacuje."""
+        if not self._seekable:
+            raise RuntimeError("Nastavak zapisa nije moguć za komprimirani izlaz (.gz/.zst)")
+        self._part = state['part']
+        self.paths = [Path(path) for path in state['paths']]
+        self.count = state['count']
+        self._part_count = state['part_count']
+        self._part_bytes = state['part_bytes']
+        self._count_offset = state['count_offset']
+        if state['open']:
+            self._file = open(self.paths[-1], 'r+b')
+            self._file.truncate(self._part_bytes)
+            self._file.seek(self._part_bytes)
+
+    def close(self):
+        """Zatvori zadnju datoteku (COMMIT; + broj statementa)."""
+        if self._file is not None:
+            self._close_part()
+        return self.paths
+
+    def abort(self):
+        """Zatvori zadnju datoteku bez COMMIT-a (npr. nakon greške)."""
+        if self._file is not None:
+            self._close_part(complete=False)
+        return self.paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
@@ -0,0 +1,574 @@
+# -*- coding: utf-8 -*-
+"""
+Jedan prolaz kroz dump za više izlaza (sinkova).
+
+scan_dump() čita dump jednom (uz indeks / TOC arhive samo potrebne
+sekcije), puni SchemaCatalog i svaki redak COPY bloka predaje svim
+sinkovima koji žele tu tablicu. Redak se dekodira najviše jednom i samo
+ako ga neki sink zatraži (DumpRow.values) - UpdateSink prije toga
+propušta retke kroz LinePrefilter.
+
+Sinkovi:
+- InsertSink: INSERT/COPY izlaz za zadane tablice (GENERATE-INSERT-CATEGORY.py)
+- UpdateSink: UPDATE statementi ili primjena u bazu za popravke encodinga
+  (GENERATE-UPDATE-FROM-BACKUP.py, i u workerima paralelne obrade)
+- StatsSink: JSON statistika (retci, bajtovi, vrijednosti za popravak po
+  koloni i uzorku, vrijeme po sinku)
+
+Skripte GENERATE-INSERT-CATEGORY.py i GENERATE-UPDATE-FROM-BACKUP.py
+pokreću scan_dump/scan_lines s jednim sinkom, a GENERATE-FROM-BACKUP.py
+kombinira sinkove iz komandne linije.
+"""
+
+import sys
+import time
+from contextlib import closing
+from pathlib import Path
+
+from .copy_format import LinePrefilter, decode_copy_line, encode_copy_line, parse_copy_statement
+from .dump_index import iter_dump_lines
+from .dump_io import SqlWriter
+from .row_fingerprints import row_fingerprint
+from .schema import SchemaCatalog
+from .sql_format import InsertBuilder, UpdateBuilder, format_sql_values, quote_identifier
+from .stats import RunStats
+
+
+class DumpRow:
+    """Redak COPY bloka: sirovi bajtovi (bez '\\n') i vrijednosti dekodirane pri prvom pristupu."""
+
+    __slots__ = ('line_num', 'raw', 'text', '_values')
+
+    def __init__(self, line_num, raw, text=None):
+        self.line_num = line_num
+        self.raw = raw
+        self.text = text
+        self._values = None
+
+    @property
+    def values(self):
+        if self._values is None:
+            text = self.text if self.text is not None else self.raw.decode('utf-8', errors='ignore')
+            self._values = decode_copy_line(text)
+        return self._values
+
+
+class Sink:
+    """
+    Osnova za sink: tables je skup tablica koje sink želi (None = sve).
+    start_table/end_table omeđuju COPY blok, row() prima DumpRow,
+    undecodable() broj retka koji uz strict nije ispravan UTF-8 (ne predaje
+    se row()), close() završava izlaz i vraća sažetak (dict) za ispis i
+    statistiku.
+    """
+
+    name = 'sink'
+    tables = None
+
+    def wants(self, table):
+        return self.tables is None or table in self.tables
+
+    def start_table(self, table, columns, catalog):
+        pass
+
+    def row(self, row):
+        pass
+
+    def undecodable(self, line_num):
+        pass
+
+    def end_table(self):
+        pass
+
+    def close(self, run):
+        return {}
+
+    def abort(self):
+        pass
+
+
+class InsertSink(Sink):
+    """
+    INSERT statementi (ili COPY blokovi) s popravljenim vrijednostima za zadane tablice.
+
+    stats (RunStats): retci/bajtovi/popravljeni retci po tablici, popravci
+    po koloni i uzorku i vrijeme faza parse/repair/write.
+    """
+
+    def __init__(self, output_path, tables, repair, output_mode='insert', batch_size=500,
+                 split_mb=None, source='', stats=None):
+        self.tables = list(tables)
+        self.name = 'insert:' + ','.join(self.tables)
+        self.repair = repair
+        self.output_mode = output_mode
+        self.batch_size = batch_size
+        self.stats = stats
+        self.rows = 0
+        self.bad_rows = 0
+        self.found = set()
+        title_target = (
+            f"{self.tables[0].upper()} TABLICU" if len(self.tables) == 1
+            else f"TABLICE: {', '.join(self.tables).upper()}"
+        )
+        self.writer = SqlWriter(
+            output_path,
+            title=f"GENERIRANI {'COPY BLOK' if output_mode == 'copy' else 'INSERT STATEMENTI'} ZA {title_target}",
+            source=source,
+            noun="redaka (COPY)" if output_mode == 'copy' else "INSERT statementa",
+            preamble="-- Obriši postojeće podatke (opcionalno)\n" + ''.join(
+                f'-- DELETE FROM public."{table}";\n' for table in self.tables
+            ) + "\n",
+            split_mb=split_mb,
+        )
+        if stats is not None:
+            # Formatiranje i zapis statementa ulaze u fazu 'write'
+            self.writer.write = stats.timed('write', self.writer.write)
+        self._table = None
+        self._table_stats = None
+        self._columns = None
+        self._column_types = None
+        self._builder = None
+
+    def start_table(self, table, columns, catalog):
+        print(f"[INFO] Pronadjen COPY statement za {table} tablicu")
+        self.found.add(table)
+        self._table = table
+        self._columns = columns
+        types = catalog.column_types(table) or {}
+        self._column_types = [types.get(col) for col in columns]
+        if self.stats is not None:
+            self._table_stats = self.stats.table(table)
+        table_sql = f'public."{table}"'
+        if self.output_mode == 'copy':
+            columns_str = ', '.join(quote_identifier(col) for col in columns)
+            self.writer.set_body(f'COPY {table_sql} ({columns_str}) FROM stdin;\n', '\\.\n')
+        else:
+            self._builder = InsertBuilder(
+                table_sql,
+                columns,
+                batch_size=1 if self.output_mode == 'insert' else self.batch_size,
+                upsert_key='id' if self.output_mode == 'upsert' else None,
+            )
+            if self.stats is not None:
+                self._builder.add = self.stats.timed('write', self._builder.add)
+
+    def row(self, row):
+        if not row.raw.strip():
+            return
+        stats = self.stats
+        if stats is not None:
+            entry = self._table_stats
+            entry['rows'] += 1
+            entry['bytes'] += len(row.raw) + 1
+            started = time.perf_counter()
+        try:
+            values = row.values
+            if stats is not None:
+                parsed = time.perf_counter()
+                stats.times['parse'] += parsed - started
+            if len(values) != len(self._columns):
+                self.bad_rows += 1
+                print(f"[WARNING] Linija {row.line_num}: Očekivano {len(self._columns)} kolona, dobiveno {len(values)}")
+                return
+            fixed = [self.repair.repair(str(value)) if value is not None else None for value in values]
+            if stats is not None:
+                stats.times['repair'] += time.perf_counter() - parsed
+                changed = False
+                for column, value, fixed_value in zip(self._columns, values, fixed):
+                    if fixed_value != value:
+                        stats.add_fix(entry, column, self.repair.engine.match_counts(value))
+                        changed = True
+                entry['changed_rows'] += changed
+            if self._builder is None:
+                self.writer.write(encode_copy_line(fixed))
+            else:
+                statement = self._builder.add(format_sql_values(fixed, self._column_types))
+                if statement:
+                    self.writer.write(statement)
+            self.rows += 1
+        except Exception as e:
+            self.bad_rows += 1
+            print(f"[WARNING] Linija {row.line_num}: Greska pri parsiranju: {e}")
+
+    def end_table(self):
+        print(f"[INFO] Kraj {self._table} sekcije")
+        if self._builder is not None:
+            statement = self._builder.flush()
+            if statement:
+                self.writer.write(statement)
+            self._builder = None
+        self._table = None
+
+    def close(self, run):
+        paths = self.writer.close()
+        return {
+            'output': [str(path) for path in paths],
+            'rows': self.rows,
+            'bad_rows': self.bad_rows,
+            'statements': self.writer.count,
+            'missing_tables': [table for table in self.tables if table not in self.found],
+        }
+
+    def abort(self):
+        self.writer.abort()
+
+
+class UpdateSink(Sink):
+    """
+    UPDATE statementi za tekstualne kolone čija se vrijednost popravkom mijenja.
+
+    Popravci retka idu kroz add() (paralelna obrada ga poziva s rezultatima
+    workera). Opcionalno:
+    - applier (FixApplier): popravci se primjenjuju izravno u bazu umjesto
+      zapisa u output_path (output_path=None: bez izlazne datoteke)
+    - previous (RowFingerprints prethodnog dumpa): redak s istim otiskom
+      tekstualnih kolona se preskače (counts['unchanged'])
+    - fingerprints (RowFingerprints): otisci popravljenih redaka ove obrade
+    - stats (RunStats): retci/bajtovi/popravci po tablici, popravci po
+      koloni i uzorku i vrijeme faza parse/repair/write
+    """
+
+    name = 'update'
+    # Poruka o svakoj COPY tablici (worker paralelne obrade je ne ispisuje)
+    announce_tables = True
+
+    def __init__(self, output_path, repair, update_mode='column', batch_size=500, split_mb=None,
+                 tables=None, source='', applier=None, previous=None, fingerprints=None, stats=None):
+        self.tables = set(tables) if tables else None
+        self.repair = repair
+        self.needs_decoding = LinePrefilter(repair.engine)
+        self.updates = UpdateBuilder(update_mode, batch_size)
+        # Zbrajaju se preko paralelnih dijelova; 'warned' su tablice za koje je
+        # u ovoj obradi već ispisano upozorenje o retku koji se ne može dekodirati
+        self.counts = {'rows': 0, 'skipped': 0, 'undecodable': 0, 'unparsable': 0, 'fixed': 0, 'unchanged': 0,
+                       'warned': []}
+        self.writer = None
+        if output_path is not None:
+            self.writer = SqlWriter(
+                output_path,
+                title="GENERIRANI UPDATE STATEMENTI IZ BACKUP DATOTEKE",
+                source=source,
+                noun="UPDATE statementa",
+                split_mb=split_mb,
+            )
+        self.applier = applier
+        self.previous = previous
+        self.fingerprints = fingerprints
+        self.with_fingerprints = previous is not None or fingerprints is not None
+        self.stats = stats
+        self._apply = applier.add if applier is not None else None
+        if stats is not None:
+            # Formatiranje i zapis statementa (ili predaja applieru) ulaze u fazu 'write'
+            self.updates.add = stats.timed('write', self.updates.add)
+            if self.writer is not None:
+                self.writer.write = stats.timed('write', self.writer.write)
+            if self._apply is not None:
+                self._apply = stats.timed('write', self._apply)
+        self._table = None
+        self._table_stats = None
+        self._columns = None
+        self._id_index = None
+        self._text_columns = None
+
+    @property
+    def in_table(self):
+        """Je li sink usred COPY bloka tablice s id kolonom."""
+        return self._id_index is not None
+
+    def start_table(self, table, columns, catalog):
+        self._table = table
+        self._columns = columns
+        self._id_index = columns.index('id') if 'id' in columns else None
+        self._text_columns = catalog.text_column_indexes(table, columns)
+        if self.stats is not None and self._id_index is not None:
+            self._table_stats = self.stats.table(table)
+        if self.announce_tables:
+            print(f"  [INFO] Tablica: {table}, {len(columns)} kolona ({len(self._text_columns)} tekstualnih)")
+
+    def undecodable(self, line_num):
+        if self._id_index is not None:
+            self.counts['rows'] += 1
+            self.counts['undecodable'] += 1
+
+    def row(self, row):
+        if self._id_index is None:
+            return
+        counts = self.counts
+        counts['rows'] += 1
+        stats = self.stats
+        if stats is not None:
+            entry = self._table_stats
+            entry['rows'] += 1
+            entry['bytes'] += len(row.raw) + 1
+            started = time.perf_counter()
+        # Čisti ASCII redak bez escape-ova ne može dati UPDATE
+        if not self.needs_decoding(row.raw):
+            counts['skipped'] += 1
+            return
+        try:
+            values = row.values
+        except (ValueError, UnicodeDecodeError) as e:
+            # Neispravan escape (npr. oktalni bajt koji nije UTF-8); uz --strict scan_lines prekida prije
+            counts['unparsable'] += 1
+            if self._table not in counts['warned']:
+                counts['warned'].append(self._table)
+                print(
+                    f"  [WARNING] Linija {row.line_num} (tablica {self._table}): redak se ne moze dekodirati ({e}), "
+                    f"preskocen; ostali takvi retci ove tablice samo se broje",
+                    file=sys.stderr,
+                )
+            return
+        if stats is not None:
+            parsed = time.perf_counter()
+            stats.times['parse'] += parsed - started
+        if len(values) <= self._id_index or not values[self._id_index]:
+            return
+        fixes = []
+        for col_index in self._text_columns:
+            if col_index >= len(values):
+                break
+            value = values[col_index]
+            if value:
+                fixed_value = self.repair.repair(value)
+                if fixed_value != value:
+                    fixes.append((self._columns[col_index], fixed_value))
+                    if stats is not None:
+                        stats.add_fix(entry, self._columns[col_index], self.repair.engine.match_counts(value))
+        if stats is not None:
+            stats.times['repair'] += time.perf_counter() - parsed
+            entry['changed_rows'] += bool(fixes)
+        if fixes:
+            fingerprint = row_fingerprint(row.raw, self._text_columns) if self.with_fingerprints else None
+            self.add(self._table, values[self._id_index], fixes, fingerprint)
+
+    def add(self, table, id_value, fixes, fingerprint=None):
+        """Popravci jednog retka -> baza ili UPDATE statementi (uz previous nepromijenjen redak se preskače)."""
+        if fingerprint is not None:
+            if self.fingerprints is not None:
+                self.fingerprints.add(table, id_value, fingerprint)
+            if self.previous is not None and self.previous.unchanged(table, id_value, fingerprint):
+                self.counts['unchanged'] += 1
+                return
+        # Samo popravci koji idu u izlaz (ne i retci preskočeni uz previous)
+        self.counts['fixed'] += len(fixes)
+        if self._apply is not None:
+            self._apply(table, id_value, fixes)
+            return
+        for statement in self.updates.add(table, id_value, fixes):
+            self.writer.write(statement)
+
+    def flush(self):
+        """Zapiši započeti batch UPDATE (kraj COPY sekcije)."""
+        for statement in self.updates.flush():
+            self.writer.write(statement)
+
+    def end_table(self):
+        self.flush()
+        self._table = None
+        self._id_index = None
+
+    def close(self, run):
+        paths = self.writer.close() if self.writer is not None else []
+        return dict(
+            self.counts,
+            output=[str(path) for path in paths],
+            statements=self.writer.count if self.writer is not None else 0,
+        )
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.abort()
+
+
+class StatsSink(Sink):
+    """
+    Statistika dumpa (RunStats JSON): retci i bajtovi po tablici, tekstualne
+    vrijednosti koje popravak mijenja po koloni i uzorku, vrijeme čitanja i
+    vrijeme po sinku (faze 'sink:<ime>'), sažeci ostalih sinkova.
+    """
+
+    name = 'stats'
+
+    def __init__(self, stats_path, repair, tables=None, source=''):
+        self.stats_path = stats_path
+        self.tables = set(tables) if tables else None
+        self.repair = repair
+        self.needs_decoding = LinePrefilter(repair.engine)
+        self.source = source
+        self.stats = RunStats()
+        self._entry = None
+        self._columns = None
+        self._text_columns = None
+
+    def start_table(self, table, columns, catalog):
+        self._entry = self.stats.table(table)
+        self._columns = columns
+        self._text_columns = catalog.text_column_indexes(table, columns)
+
+    def row(self, row):
+        entry = self._entry
+        entry['rows'] += 1
+        entry['bytes'] += len(row.raw) + 1
+        if not self.needs_decoding(row.raw):
+            return
+        try:
+            values = row.values
+        except (ValueError, UnicodeDecodeError):
+            # Redak se ne može dekodirati - upozorenje i broj daje UpdateSink / scan_lines
+            return
+        engine = self.repair.engine
+        changed = False
+        for col_index in self._text_columns:
+            if col_index >= len(values):
+                break
+            value = values[col_index]
+            if value and self.repair.repair(value) != value:
+                self.stats.add_fix(entry, self._columns[col_index], engine.match_counts(value))
+                changed = True
+        entry['changed_rows'] += changed
+
+    def close(self, run):
+        self.stats.bytes_read = run['bytes']
+        self.stats.times = {'read': run['times']['read']}
+        self.stats.times.update((f'sink:{name}', seconds) for name, seconds in run['times'].items() if name != 'read')
+        self.stats.write(
+            self.stats_path,
+            script='GENERATE-FROM-BACKUP.py',
+            dump=self.source,
+            rows_dispatched=run['rows'],
+            rows_decoded=run['decoded'],
+            undecodable=run['undecodable'],
+            sinks=run['sinks'],
+        )
+        return {'output': [str(self.stats_path)]}
+
+
+def wanted_tables(sinks):
+    """Tablice koje žele sinkovi ili None ako neki želi sve."""
+    wanted = set()
+    for sink in sinks:
+        if sink.tables is None:
+            return None
+        wanted.update(sink.tables)
+    return wanted
+
+
+def scan_dump(backup_path, sinks, use_index=True, strict=False):
+    """
+    Jedan prolaz kroz dump za sve sinkove (vidi scan_lines). Čitaju se
+    samo tablice koje neki sink želi (ako svi imaju popis tablica).
+    """
+    wanted = wanted_tables(sinks)
+    lines = iter_dump_lines(Path(backup_path), tables=sorted(wanted) if wanted is not None else None,
+                            use_index=use_index)
+    return scan_lines(lines, sinks, strict=strict)
+
+
+def scan_lines(lines, sinks, catalog=None, strict=False):
+    """
+    Retci dumpa (broj retka, sirovi redak) za sve sinkove. CREATE TABLE
+    izvan COPY blokova puni catalog (može biti unaprijed popunjen), a
+    čitanje staje kad su pronađene sve tablice koje sinkovi žele. Uz
+    strict=True redak s neispravnim UTF-8 se prijavljuje i ne predaje
+    nijednom sinku, a redak s neispravnim escape-om prekida čitanje.
+
+    Vraća {'rows', 'decoded', 'undecodable', 'bytes', 'times', 'sinks'}:
+    times su sekunde čitanja ('read') i po sinku (uz dekodiranje retka
+    koje je sink prvi zatražio), sinks su sažeci iz close() redom sinkova.
+    Kod greške se izlazi svih sinkova odbacuju (abort) i greška se propagira.
+    """
+    wanted = wanted_tables(sinks)
+    pending = set(wanted) if wanted is not None else None
+
+    run = {
+        'rows': 0,
+        'decoded': 0,
+        'undecodable': 0,
+        'bytes': 0,
+        'times': dict.fromkeys(['read'] + [sink.name for sink in sinks], 0.0),
+        'sinks': {},
+    }
+    times = run['times']
+    catalog = catalog if catalog is not None else SchemaCatalog()
+    in_copy = False
+    active = []
+    perf_counter = time.perf_counter
+
+    try:
+        with closing(lines):
+            iterator = iter(lines)
+            while True:
+                started = perf_counter()
+                item = next(iterator, None)
+                times['read'] += perf_counter() - started
+                if item is None:
+                    break
+                line_num, raw = item
+                run['bytes'] += len(raw)
+                raw = raw.rstrip(b'\n\r')
+
+                if raw.startswith(b'COPY '):
+                    in_copy = True
+                    table, columns = parse_copy_statement(raw.decode('utf-8', errors='ignore'))
+                    active = [sink for sink in sinks if table and columns and sink.wants(table)]
+                    for sink in active:
+                        sink.start_table(table, columns, catalog)
+                    continue
+
+                if raw == b'\\.' or raw.strip() == b'\\.':
+                    for sink in active:
+                        sink.end_table()
+                    if pending is not None and active:
+                        pending.discard(table)
+                    in_copy = False
+                    active = []
+                    if pending is not None and not pending:
+                        break
+                    continue
+
+                # Izvan COPY bloka - CREATE TABLE ide u katalog tipova
+                if not in_copy:
+                    catalog.feed_bytes(raw)
+                    continue
+                if not active:
+                    continue
+
+                text = None
+                if strict:
+                    try:
+                        text = raw.decode('utf-8')
+                    except UnicodeDecodeError as e:
+                        run['undecodable'] += 1
+                        print(
+                            f"  [WARNING] Linija {line_num}: neispravan UTF-8 na poziciji {e.start} "
+                            f"({raw[e.start:e.end].hex()}), redak preskocen",
+                            file=sys.stderr,
+                        )
+                        for sink in active:
+                            sink.undecodable(line_num)
+                        continue
+                row = DumpRow(line_num, raw, text)
+                if strict and b'\\' in raw:
+                    # Neispravan escape prekida obradu umjesto da ga sinkovi preskoče
+                    try:
+                        row.values
+                    except (ValueError, UnicodeDecodeError) as e:
+                        raise ValueError(f"Linija {line_num}: redak se ne moze dekodirati: {e}") from e
+                run['rows'] += 1
+                for sink in active:
+                    started = perf_counter()
+                    sink.row(row)
+                    times[sink.name] += perf_counter() - started
+                if row._values is not None:
+                    run['decoded'] += 1
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+
+    # Dump bez '\\.' na kraju zadnjeg COPY bloka
+    for sink in active:
+        sink.end_table()
+    for sink in sinks:
+        run['sinks'][sink.name] = sink.close(run)
+    return run
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Liste problematičnih znakova (regex, zamjena) za generirane skripte.
+
+GENERATE-UPDATE-FROM-BACKUP.py koristi UPDATE_PATTERNS, a
+GENERATE-INSERT-CATEGORY.py INSERT_PATTERNS (iste zamjene + popravci
+koji se rade samo kod ponovnog unosa redaka).
+"""
+
+# Problematični znakovi koje treba popraviti
+UPDATE_PATTERNS = [
+    (r'┼ż', 'ž'), (r'┼í', 'š'), (r'┼ì', 'č'), (r'┼░', 'đ'), (r'┼ü', 'Ž'), (r'┼Ü', 'Š'),
+    (r'<\|', 'ž'), (r'\|>', 'ž'),
+    (r'Âž', 'ž'), (r'Âć', 'ć'), (r'Âč', 'č'), (r'Âđ', 'đ'), (r'Âš', 'š'), (r'ÂŽ', 'Ž'), (r'ÂĆ', 'Ć'), (r'ÂČ', 'Č'),
+    (r'─Ź', 'č'), (r'─ć', 'ć'), (r'─î', 'Č'), (r'─í', 'ć'), (r'─ì', 'č'), (r'─Ĺ', 'đ'), (r'─ç', 'ć'),
+    (r'┼á', 'š'), (r'Ôćö', '↔'), (r'Ôëą', '≥'), (r'Ôćĺ', '→'),
+    (r'ZAVRšEN', 'ZAVRŠEN'),  # CASE fix
+    (r'\\n', '\n'),  # Literalni \n -> stvarni novi red (dva znaka: backslash + n -> jedan znak: novi red)
+]
+
+INSERT_PATTERNS = UPDATE_PATTERNS + [
+    # Dodatni encoding problemi - zamijeni s ASCII ekvivalentom ili ostavi ako nije poznat
+    (r'├ę', 'e'),  # Plinoinstalat├ęr -> Plinoinstalater
+    # Možda treba biti drugačije - provjeri kontekst
+]
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+Čitanje pg_dump arhiva u custom (-Fc) i directory (-Fd) formatu bez
+pg_restore-a i bez međudatoteke u plain formatu.
+
+Iz TOC-a se uzimaju CREATE TABLE naredbe (za SchemaCatalog) i TABLE DATA
+unosi s COPY naredbom. Podaci traženih tablica dekomprimiraju se u hodu
+(gzip/zlib, zstd - paket `zstandard`, lz4 - paket `lz4`), ostali se
+preskaču. iter_archive_positions() daje retke istim redom i oblikom kao
+plain dump (CREATE TABLE, COPY ..., podaci, \\.) pa skripte arhivu čitaju
+kao običan dump; iter_section_lines() čita podatke jedne tablice (za
+paralelnu obradu).
+"""
+
+import io
+import zlib
+from pathlib import Path
+
+from .copy_format import parse_copy_statement
+from .dump_io import _zstandard, open_dump
+
+MAGIC = b'PGDMP'
+# Najstarija podržana verzija arhive (pg_dump 8.4+)
+MIN_VERSION = (1, 10)
+
+# Format u zaglavlju: directory format u toc.dat upisuje kod tar formata (3)
+_FORMAT_CUSTOM = 1
+_FORMAT_TAR = 3
+_COMPRESSION = {0: None, 1: 'gzip', 2: 'lz4', 3: 'zstd'}
+
+# Stanje pozicije podataka u TOC-u custom formata (K_OFFSET_*)
+_OFFSET_NOT_SET = 1
+_OFFSET_SET = 2
+_OFFSET_NO_DATA = 3
+# Vrste blokova podataka u custom formatu
+_BLOCK_DATA = 1
+_BLOCK_BLOBS = 3
+
+_READ_SIZE = 1024 * 1024
+
+
+def _lz4_frame():
+    try:
+        import lz4.frame
+    except ImportError:
+        raise RuntimeError("Za lz4 komprimirane arhive potreban je paket lz4 (pip install lz4)")
+    return lz4.frame
+
+
+def _decompressor(compression):
+    if compression is None:
+        return None
+    if compression == 'gzip':
+        # Custom format piše zlib stream (deflate), directory gzip datoteke
+        return zlib.decompressobj(zlib.MAX_WBITS | 32)
+    if compression == 'zstd':
+        return _zstandard().ZstdDecompressor().decompressobj()
+    return _lz4_frame().LZ4FrameDecompressor()
+
+
+class _ArchiveReader:
+    """ReadByte/ReadInt/ReadStr/ReadOffset iz pg_backup_archiver.c."""
+
+    def __init__(self, f, int_size=4, off_size=8):
+        self.f = f
+        self.int_size = int_size
+        self.off_size = off_size
+
+    def read(self, count):
+        data = self.f.read(count)
+        if len(data) != count:
+            raise ValueError("Neočekivan kraj pg_dump arhive")
+        return data
+
+    def byte(self):
+        return self.read(1)[0]
+
+    def int(self):
+        sign = self.byte()
+        value = int.from_bytes(self.read(self.int_size), 'little')
+        return -value if sign else value
+
+    def str(self):
+        length = self.int()
+        if length < 0:
+            return None
+        return self.read(length).decode('utf-8', errors='replace')
+
+    def offset(self):
+        state = self.byte()
+        return state, int.from_bytes(self.read(self.off_size), 'little')
+
+    def skip_chunks(self):
+        """Preskoči podatke jednog bloka (duljina + bajtovi, 0 = kraj)."""
+        length = self.int()
+        while length:
+            self.f.seek(length, io.SEEK_CUR)
+            length = self.int()
+
+    def chunks(self, compression):
+        """Dekomprimirani podaci jednog bloka, dio po dio."""
+        decompressor = _decompressor(compression)
+        length = self.int()
+        while length:
+            data = self.read(length)
+            if decompressor is not None:
+                data = decompressor.decompress(data)
+            if data:
+                yield data
+            length = self.int()
+        if compression == 'gzip':
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+
+
+class _ChunkStream(io.RawIOBase):
+    """Generator bajtova kao stream - BufferedReader ga dijeli na retke."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._data = b''
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._pos >= len(self._data):
+            self._data = next(self._chunks, None)
+            self._pos = 0
+            if self._data is None:
+                self._data = b''
+                return 0
+        count = min(len(buffer), len(self._data) - self._pos)
+        buffer[:count] = self._data[self._pos:self._pos + count]
+        self._pos += count
+        return count
+
+
+def _data_lines(f):
+    """Retci COPY podataka do '\\.' (pg_dump ga zapisuje na kraj podataka)."""
+    for raw in f:
+        if raw.rstrip(b'\r\n') == b'\\.':
+            return
+        yield raw
+
+
+def is_pg_archive(path):
+    """Je li path custom arhiva (datoteka koja počinje s PGDMP) ili direktorij s toc.dat."""
+    path = Path(path)
+    if path.is_dir():
+        return (path / 'toc.dat').is_file()
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def archive_toc_path(path):
+    """Datoteka s TOC-om: sama arhiva ili <direktorij>/toc.dat."""
+    path = Path(path)
+    return path / 'toc.dat' if path.is_dir() else path
+
+
+def _read_toc_entry(reader, version, directory):
+    dump_id = reader.int()
+    reader.int()  # hadDumper
+    reader.str()  # tableoid
+    reader.str()  # oid
+    tag = reader.str()
+    desc = reader.str()
+    if version >= (1, 11):
+        reader.int()  # section
+    defn = reader.str()
+    reader.str()  # dropStmt
+    copy_stmt = reader.str()
+    namespace = reader.str()
+    reader.str()  # tablespace
+    if version >= (1, 14):
+        reader.str()  # tableam
+    if version >= (1, 16):
+        reader.int()  # relkind
+    reader.str()  # owner
+    reader.str()  # WITH OIDS ('false')
+    while reader.str() is not None:  # ovisnosti
+        pass
+    entry = {
+        'dump_id': dump_id,
+        'tag': tag,
+        'desc': desc,
+        'schema': namespace,
+        'defn': defn,
+        'copy_stmt': copy_stmt,
+    }
+    if directory:
+        entry['filename'] = reader.str() or None
+    else:
+        entry['data_state'], entry['data_pos'] = reader.offset()
+    return entry
+
+
+def read_archive(path):
+    """
+    Zaglavlje i TOC arhive:
+    {'header': {...}, 'schema': [CREATE TABLE naredbe], 'sections': [TABLE DATA unosi]}.
+
+    header sadrži sve što treba za čitanje podataka (i u drugom procesu),
+    a svaka sekcija tablicu i kolone iz COPY naredbe (kao u indeksu
+    plain dumpa) te poziciju podataka ili ime datoteke.
+    """
+    path = Path(path)
+    directory = path.is_dir()
+    with open(archive_toc_path(path), 'rb') as f:
+        reader = _ArchiveReader(f)
+        if reader.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} nije pg_dump arhiva (custom ili directory format)")
+        version = (reader.byte(), reader.byte())
+        reader.byte()  # revizija
+        if version < MIN_VERSION:
+            raise ValueError(f"Verzija arhive {version[0]}.{version[1]} nije podržana (pg_dump 8.4+)")
+        reader.int_size = reader.byte()
+        reader.off_size = reader.byte()
+        archive_format = reader.byte()
+        if archive_format != (_FORMAT_TAR if directory else _FORMAT_CUSTOM):
+            raise ValueError(f"{path}: podržani su samo custom (-Fc) i directory (-Fd) formati")
+        if version >= (1, 15):
+            code = reader.byte()
+            if code not in _COMPRESSION:
+                raise ValueError(f"{path}: nepoznata kompresija ({code})")
+            compression = _COMPRESSION[code]
+        else:
+            compression = 'gzip' if reader.int() else None
+        for _ in range(7):  # vrijeme izrade
+            reader.int()
+        reader.str()  # baza
+        reader.str()  # verzija servera
+        reader.str()  # verzija pg_dump-a
+
+        entries = [_read_toc_entry(reader, version, directory) for _ in range(reader.int())]
+        data_start = f.tell()
+
+    header = {
+        'path': str(path),
+        'format': 'directory' if directory else 'custom',
+        'version': list(version),
+        'compression': compression,
+        'int_size': reader.int_size,
+        'off_size': reader.off_size,
+        'data_start': data_start,
+    }
+    schema = [e['defn'] for e in entries if e['desc'] == 'TABLE' and e['defn']]
+    sections = []
+    for entry in entries:
+        if entry['desc'] != 'TABLE DATA' or not entry['copy_stmt']:
+            continue
+        header_line = entry['copy_stmt'].strip()
+        table, columns = parse_copy_statement(header_line)
+        section = {
+            'dump_id': entry['dump_id'],
+            'table': table,
+            'columns': columns,
+            'header': header_line,
+        }
+        if directory:
+            section['filename'] = entry['filename']
+        else:
+            section['data_state'] = entry['data_state']
+            section['data_pos'] = entry['data_pos']
+        sections.append(section)
+    return {'header': header, 'schema': schema, 'sections': sections}
+
+
+def archive_sections(archive, tables=None):
+    """TABLE DATA sekcije (redom iz TOC-a) za tablice iz `tables` (None = sve prepoznate)."""
+    wanted = set(tables) if tables else None
+    return [
+        s for s in archive['sections']
+        if s['table'] and (wanted is None or s['table'] in wanted)
+    ]
+
+
+def has_data_positions(archive):
+    """
+    Mogu li se podaci pojedine tablice čitati izravno (i paralelno).
+    Custom arhiva zapisana u pipe nema pozicija u TOC-u pa se čita redom.
+    """
+    if archive['header']['format'] == 'directory':
+        return True
+    return all(s['data_state'] != _OFFSET_NOT_SET for s in archive['sections'])
+
+
+def _open_directory_data(directory, filename):
+    base = Path(directory) / filename
+    for suffix in ('', '.gz', '.zst'):
+        path = Path(str(base) + suffix)
+        if path.exists():
+            return open_dump(path)
+    path = Path(str(base) + '.lz4')
+    if path.exists():
+        return _lz4_frame().open(path, 'rb')
+    raise FileNotFoundError(f"Datoteka s podacima ne postoji: {base}")
+
+
+def iter_section_lines(header, section):
+    """Sirovi retci podataka jedne TABLE DATA sekcije (bez završnog '\\.')."""
+    if header['format'] == 'directory':
+        if not section['filename']:
+            return
+        with _open_directory_data(header['path'], section['filename']) as f:
+            yield from _data_lines(f)
+        return
+
+    if section['data_state'] == _OFFSET_NO_DATA:
+        return
+    if section['data_state'] != _OFFSET_SET:
+        raise ValueError(f"Arhiva nema poziciju podataka za {section['table']} (pg_dump u pipe) - cita se redom")
+    with open(header['path'], 'rb') as f:
+        f.seek(section['data_pos'])
+        reader = _ArchiveReader(f, header['int_size'], header['off_size'])
+        block_type = reader.byte()
+        if block_type != _BLOCK_DATA or reader.int() != section['dump_id']:
+            raise ValueError(f"Neispravna pozicija podataka za {section['table']} u arhivi")
+        with io.BufferedReader(_ChunkStream(reader.chunks(header['compression'])), _READ_SIZE) as data:
+            yield from _data_lines(data)
+
+
+def _iter_sequential(header, sections):
+    """
+    Custom arhiva bez pozicija: blokovi redom kroz datoteku, podaci
+    nepotrebnih tablica (i large objekti) se preskaču bez dekompresije.
+    """
+    by_id = {s['dump_id']: s for s in sections}
+    with open(header['path'], 'rb') as f:
+        f.seek(header['data_start'])
+        reader = _ArchiveReader(f, header['int_size'], header['off_size'])
+        while by_id:
+            block = f.read(1)
+            if not block:
+                return
+            dump_id = reader.int()
+            if block[0] == _BLOCK_BLOBS:
+                while reader.int():  # oid large objekta, 0 = kraj
+                    reader.skip_chunks()
+                continue
+            section = by_id.pop(dump_id, None)
+            if section is None:
+                reader.skip_chunks()
+                continue
+            chunks = reader.chunks(header['compression'])
+            yield section, _data_lines(io.BufferedReader(_ChunkStream(chunks), _READ_SIZE))
+            # Ostatak bloka (iza '\\.') da bi datoteka bila na sljedećem bloku
+            for _ in chunks:
+                pass
+
+
+def _iter_plain(archive, tables):
+    for defn in archive['schema']:
+        for line in defn.splitlines(keepends=True):
+            yield line.encode('utf-8')
+        yield b'\n'
+
+    header = archive['header']
+    sections = archive_sections(archive, tables)
+    if has_data_positions(archive):
+        pairs = ((section, iter_section_lines(header, section)) for section in sections)
+    else:
+        pairs = _iter_sequential(header, sections)
+    for section, lines in pairs:
+        yield (section['header'] + '\n').encode('utf-8')
+        yield from lines
+        yield b'\\.\n'
+
+
+def iter_archive_positions(path, tables=None, start=0):
+    """
+    (broj retka, pozicija u bajtovima, sirovi redak) kao da je arhiva plain
+    dump: CREATE TABLE naredbe iz TOC-a, zatim za svaku traženu tablicu
+    COPY naredba, podaci i '\\.'. Pozicija je u tom plain sadržaju;
+    retci prije `start` se preskaču (za nastavak prekinute obrade).
+    """
+    archive = read_archive(path)
+    pos = 0
+    for line_num, raw in enumerate(_iter_plain(archive, tables), 1):
+        if pos >= start:
+            yield line_num, pos, raw
+        pos += len(raw)
@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+Popravak encodinga (mojibake) u jednom prolazu.
+
+Skripte drže listu (regex, zamjena) parova koje su ranije primjenjivale
+redom, jedan re.sub po paru. RepairEngine sve uzorke kompilira u jednu
+alternaciju pa za svaku vrijednost radi samo jedan prolaz, a rezultat je
+identičan redoslijednoj primjeni liste.
+"""
+
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+# Mapa za cache (codec tablice, kasnije i ostali sidecar podaci)
+CACHE_DIR = Path(os.environ.get('BACKUP_FIX_CACHE', Path.home() / '.cache' / 'backup_fix'))
+
+# Znakovi za koje se generiraju codec tablice: hrvatska slova + česti simboli
+CODEC_CHARSET = (
+    'čćžšđČĆŽŠĐ'
+    'áéíóúäöüÁÉÍÓÚÄÖÜ'
+    '€„“”‘’–—…•°±×÷≤≥←→↔✓«»'
+)
+
+# UTF-8 bajtovi pogrešno dekodirani kao jedan od ovih codeca (redom prioriteta)
+CODEC_SOURCES = ('cp852', 'cp1250', 'cp1252', 'iso8859_2', 'cp437')
+
+CODEC_TABLE_VERSION = 1
+
+# Regex metaznakovi koji se ne smiju pojaviti neescape-ani u uzorku
+_REGEX_META = set('.^$*+?{}[]|()')
+
+
+def _pattern_literal(pattern):
+    """Pretvori regex uzorak bez metaznakova u doslovni string."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                raise ValueError(f"Uzorak nije doslovni string: {pattern!r}")
+            out.append(pattern[i + 1])
+            i += 2
+            continue
+        if char in _REGEX_META:
+            raise ValueError(f"Uzorak nije doslovni string: {pattern!r}")
+        out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+def _overlaps_earlier(literal, earlier):
+    """
+    Može li `literal` početi prije `earlier` i preklopiti ga?
+    Tada bi jedan prolaz dao prednost uzorku koji se u listi primjenjuje kasnije.
+    """
+    for k in range(1, len(literal)):
+        tail = literal[k:]
+        if earlier.startswith(tail) or tail.startswith(earlier):
+            return True
+    return False
+
+
+class RepairEngine:
+    """
+    Jednoprolazni popravak teksta prema listi (regex, zamjena) parova.
+
+    - needs_repair(text): jedan re.search nad svim uzorcima
+    - repair(text): jedan re.sub nad svim uzorcima
+
+    Uzorci koji bi se mogli preklopiti s ranijim uzorcima, kao i zamjene
+    koje stvaraju novi pogodak (npr. 'ZAVR┼íEN' -> 'ZAVRšEN' -> 'ZAVRŠEN'),
+    prepoznaju se i za takve vrijednosti koristi se redoslijedna primjena.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._sequential = [(re.compile(p), r) for p, r in self.patterns]
+
+        self._replacements = {}
+        self._pattern_of = {}
+        unsafe = []
+        for pattern, replacement in self.patterns:
+            literal = _pattern_literal(pattern)
+            if literal in self._replacements:
+                continue
+            self._pattern_of[literal] = pattern
+            # re.sub obrađuje escape sekvence u zamjeni - dobij stvarnu vrijednost
+            self._replacements[literal] = re.sub('x', replacement, 'x')
+            earlier = list(self._replacements)[:-1]
+            if any(_overlaps_earlier(literal, prev) for prev in earlier):
+                unsafe.append(literal)
+
+        # Alternacija poštuje redoslijed liste, kao i redoslijedni re.sub
+        self._regex = re.compile('|'.join(re.escape(lit) for lit in self._replacements))
+        self._unsafe_regex = (
+            re.compile('|'.join(re.escape(lit) for lit in unsafe)) if unsafe else None
+        )
+
+    def ascii_literals(self):
+        """Uzorci koji se mogu pojaviti i u čistom ASCII tekstu (npr. '<|')."""
+        return [lit for lit in self._replacements if lit.isascii()]
+
+    def _lookup(self, match):
+        return self._replacements[match.group()]
+
+    def needs_repair(self, text):
+        """Provjeri ima li tekst barem jedan problematični uzorak."""
+        if not text or not isinstance(text, str):
+            return False
+        return self._regex.search(text) is not None
+
+    def match_counts(self, text):
+        """Broj pogodaka po uzorku iz liste (ključ je uzorak kako je u listi) - za statistiku."""
+        counts = {}
+        if not text or not isinstance(text, str):
+            return counts
+        for match in self._regex.finditer(text):
+            pattern = self._pattern_of[match.group()]
+            counts[pattern] = counts.get(pattern, 0) + 1
+        return counts
+
+    def repair_sequential(self, text):
+        """Referentna implementacija - re.sub za svaki uzorak redom."""
+        if not text or not isinstance(text, str):
+            return text
+        result = text
+        for regex, replacement in self._sequential:
+            result = regex.sub(replacement, result)
+        return result
+
+    def repair(self, text):
+        """Popravi tekst u jednom prolazu (isti rezultat kao repair_sequential)."""
+        if not text or not isinstance(text, str):
+            return text
+        if self._regex.search(text) is None:
+            return text
+        if self._unsafe_regex is not None and self._unsafe_regex.search(text):
+            return self.repair_sequential(text)
+        result = self._regex.sub(self._lookup, text)
+        # Zamjena je stvorila novi pogodak - redoslijedna primjena ga hvata
+        if self._regex.search(result) is not None:
+            return self.repair_sequential(text)
+        return result
+
+
+def build_codec_table(charset=CODEC_CHARSET, codecs=CODEC_SOURCES):
+    """
+    Generiraj tablicu mojibake -> ispravan znak.
+
+    Svaki znak se kodira u UTF-8 i dekodira kao pogrešan codec
+    (npr. 'ž' -> b'\\xc5\\xbe' -> cp852 '┼ż'). Ako isti artefakt daju dva
+    codeca za različite znakove, pobjeđuje codec ranije u listi.
+    """
+    table = {}
+    for codec in codecs:
+        for char in charset:
+            try:
+                garbled = char.encode('utf-8').decode(codec)
+            except UnicodeDecodeError:
+                continue
+            if garbled == char or len(garbled) < 2:
+                continue
+            # Kontrolni znakovi (npr. iso8859_2 0x80-0x9F) se ne pojavljuju u dumpu
+            if any(unicodedata.category(c) == 'Cc' for c in garbled):
+                continue
+            table.setdefault(garbled, char)
+    return table
+
+
+def load_codec_table(cache_path=None, charset=CODEC_CHARSET, codecs=CODEC_SOURCES):
+    """Učitaj codec tablicu iz cachea ili je generiraj i spremi."""
+    cache_file = Path(cache_path) if cache_path else CACHE_DIR / 'codec-table.json'
+    key = {'version': CODEC_TABLE_VERSION, 'charset': charset, 'codecs': list(codecs)}
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return cached['table']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    table = build_codec_table(charset, codecs)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'table': table}, f, ensure_ascii=False)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # Cache je samo optimizacija - tablica je već u memoriji
+        pass
+    return table
+
+
+class CodecTable:
+    """
+    Popravak prema codec tablici: jedan prolaz kroz tekst, a na svakom
+    mogućem početku artefakta (prvi znak nekog ključa) dict lookup.
+    Cijena po vrijednosti ne raste s brojem ključeva u tablici.
+    """
+
+    def __init__(self, table):
+        self.table = dict(table)
+        leads = sorted({key[0] for key in self.table})
+        self._lead_regex = re.compile('[' + ''.join(re.escape(c) for c in leads) + ']') if leads else None
+        self._lengths = sorted({len(key) for key in self.table}, reverse=True)
+
+    def needs_repair(self, text):
+        """Provjeri sadrži li tekst barem jedan artefakt iz tablice."""
+        if not text or not isinstance(text, str) or text.isascii() or self._lead_regex is None:
+            return False
+        for match in self._lead_regex.finditer(text):
+            i = match.start()
+            for n in self._lengths:
+                if text[i:i + n] in self.table:
+                    return True
+        return False
+
+    def _matches(self, text):
+        """(pozicija, artefakt) za artefakte koje repair() zamjenjuje, slijeva nadesno."""
+        pos = 0
+        for match in self._lead_regex.finditer(text):
+            i = match.start()
+            if i < pos:
+                continue
+            for n in self._lengths:
+                key = text[i:i + n]
+                if key in self.table:
+                    yield i, key
+                    pos = i + n
+                    break
+
+    def matches(self, text):
+        """Artefakti iz tablice u tekstu (za statistiku)."""
+        if not text or not isinstance(text, str) or text.isascii() or self._lead_regex is None:
+            return []
+        return [key for _, key in self._matches(text)]
+
+    def repair(self, text):
+        """Zamijeni sve artefakte iz tablice (najduži ključ na poziciji pobjeđuje)."""
+        if not text or not isinstance(text, str) or text.isascii() or self._lead_regex is None:
+            return text
+        pieces = []
+        pos = 0
+        for i, key in self._matches(text):
+            pieces.append(text[pos:i])
+            pieces.append(self.table[key])
+            pos = i + len(key)
+        if not pieces:
+            return text
+        pieces.append(text[pos:])
+        return ''.join(pieces)
+
+
+class CodecRepairEngine(RepairEngine):
+    """
+    Codec tablica pa zatim uzorci iz liste (za artefakte koje codec ne
+    pokriva, npr. '<|', 'ZAVRšEN' ili literalni \\n).
+    """
+
+    def __init__(self, patterns, table=None):
+        super().__init__(patterns)
+        self.codec_table = CodecTable(table if table is not None else load_codec_table())
+
+    def needs_repair(self, text):
+        return self.codec_table.needs_repair(text) or super().needs_repair(text)
+
+    def repair(self, text):
+        return super().repair(self.codec_table.repair(text))
+
+    def match_counts(self, text):
+        counts = {}
+        for key in self.codec_table.matches(text):
+            pattern = f'codec:{key}'
+            counts[pattern] = counts.get(pattern, 0) + 1
+        for pattern, count in super().match_counts(self.codec_table.repair(text)).items():
+            counts[pattern] = counts.get(pattern, 0) + count
+        return counts
+
+
+# Procjena memorije po unosu u cacheu osim samih stringova (dict slot + čvor OrderedDict-a)
+_CACHE_ENTRY_OVERHEAD = 120
+
+
+class RepairCache:
+    """
+    LRU memoizacija popravaka: sirova vrijednost -> rezultat engine.repair().
+
+    Iste oštećene vrijednosti (nazivi kategorija, NKD opisi, tekstovi
+    predložaka...) ponavljaju se tisućama puta kroz dump pa se popravak
+    računa jednom. Spremaju se samo vrijednosti kojima engine.needs_repair()
+    javlja popravak. Memorija je ograničena na budget_mb (procjena preko
+    sys.getsizeof); najdulje nekorištene vrijednosti se izbacuju, a
+    vrijednosti veće od max_entry_bytes se ne spremaju. budget_mb=0
+    isključuje cache.
+    """
+
+    def __init__(self, engine, budget_mb=64, max_entry_bytes=64 * 1024):
+        self.engine = engine
+        self.budget_mb = budget_mb
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.max_entry_bytes = max_entry_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def repair(self, text):
+        """Kao engine.repair(text), s memoizacijom za stringove."""
+        if not self.budget_bytes or not text or not isinstance(text, str):
+            return self.engine.repair(text)
+        # Čiste vrijednosti (većina, uključujući jedinstvene id-eve i vremena) ne idu u cache
+        if not self.engine.needs_repair(text):
+            return text
+        entry = self._entries.get(text)
+        if entry is not None:
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        result = self.engine.repair(text)
+        size = sys.getsizeof(text) + _CACHE_ENTRY_OVERHEAD
+        if result is not text:
+            size += sys.getsizeof(result)
+        if size > self.max_entry_bytes:
+            return result
+        self._entries[text] = (result, size)
+        self.size_bytes += size
+        while self.size_bytes > self.budget_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+            self.evictions += 1
+        return result
+
+    def take_stats(self):
+        """Brojači od zadnjeg poziva (za zbrajanje iz više procesa)."""
+        stats = {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+        self.hits = self.misses = self.evictions = 0
+        return stats
+
+    def add_stats(self, stats):
+        self.hits += stats['hits']
+        self.misses += stats['misses']
+        self.evictions += stats['evictions']
+
+    def summary(self):
+        """Jedan redak za ispis na kraju obrade."""
+        if not self.budget_bytes:
+            return "Cache popravaka iskljucen"
+        lookups = self.hits + self.misses
+        ratio = self.hits / lookups * 100 if lookups else 0.0
+        text = (
+            f"Cache popravaka: {self.hits} pogodaka, {self.misses} promasaja ({ratio:.1f}% pogodaka), "
+            f"{self.evictions} izbacenih"
+        )
+        # Kod paralelne obrade vrijednosti su u cacheima worker procesa
+        if self._entries:
+            text += f", {len(self._entries)} vrijednosti / {self.size_bytes / (1024 * 1024):.1f} MB"
+        return text + f" (limit {self.budget_mb:g} MB)"
+
+
+REPAIR_MODES = ('patterns', 'codec')
+
+
+def make_repair_engine(patterns, mode='patterns'):
+    """
+    Napravi engine za zadani način popravka:
+    - patterns: samo lista uzoraka (isto ponašanje kao ranije)
+    - codec: generirane codec tablice + lista uzoraka
+    """
+    if mode == 'patterns':
+        return RepairEngine(patterns)
+    if mode == 'codec':
+        return CodecRepairEngine(patterns)
+    raise ValueError(f"Nepoznat način popravka: {mode}")
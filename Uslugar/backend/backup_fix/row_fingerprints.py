@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Otisci redaka za diff između dva dumpa (--since).
+
+Za svaki redak koji je dao popravak pamti se tablica, id i 64-bitni hash
+tekstualnih kolona (jedinih u kojima se nešto popravlja). U sljedećoj
+obradi redak s istim id-em i istim hashom daje iste UPDATE-e kao prošli
+put pa se preskače; novi retci i retci čije su se tekstualne kolone
+promijenile obrađuju se normalno.
+
+Otisci se spremaju pored dumpa (<dump>.fingerprints.json.gz) i pišu se
+usput tijekom obrade, pa stari dump ne treba ponovno čitati. Za dump bez
+spremljenih otisaka gradi se indeks svih redaka koji prolaze LinePrefilter
+(bez popravljanja) - nadskup je dovoljan jer redak bez popravka ionako ne
+daje UPDATE.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from contextlib import closing
+from pathlib import Path
+
+from .copy_format import parse_copy_statement, unescape_copy_field
+from .dump_index import dump_fingerprint, iter_dump_lines
+from .schema import SchemaCatalog
+
+FINGERPRINTS_VERSION = 1
+FINGERPRINTS_SUFFIX = '.fingerprints.json.gz'
+
+
+def row_fingerprints_path(dump_path):
+    return Path(str(dump_path) + FINGERPRINTS_SUFFIX)
+
+
+def row_fingerprint(raw, text_columns):
+    """Hash tekstualnih kolona sirovog COPY retka (bez '\\n'), kao int."""
+    fields = raw.split(b'\t')
+    data = b'\t'.join(fields[i] for i in text_columns if i < len(fields))
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+class RowFingerprints:
+    """
+    Tablica -> {id: otisak}. repair je ime klase repair enginea s kojim su
+    otisci nastali - drugi engine može drukčije popraviti iste vrijednosti.
+    """
+
+    def __init__(self, repair, key=None, tables=None):
+        self.repair = repair
+        self.key = key
+        self.tables = tables if tables is not None else {}
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.tables.values())
+
+    def add(self, table, id_value, fingerprint):
+        rows = self.tables.get(table)
+        if rows is None:
+            rows = self.tables[table] = {}
+        rows[id_value] = fingerprint
+
+    def unchanged(self, table, id_value, fingerprint):
+        """Je li redak isti kao u dumpu iz kojeg su otisci."""
+        rows = self.tables.get(table)
+        return rows is not None and rows.get(id_value) == fingerprint
+
+    def save(self, path):
+        """Atomski zapis (privremena datoteka + os.replace)."""
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp')
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump({
+                'version': FINGERPRINTS_VERSION,
+                'key': self.key,
+                'repair': self.repair,
+                'tables': self.tables,
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Otisci iz datoteke ili None (nema je, neispravna je ili je stara verzija)."""
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError, EOFError):
+            return None
+        if data.get('version') != FINGERPRINTS_VERSION:
+            return None
+        return cls(data['repair'], data.get('key'), data['tables'])
+
+
+def build_row_fingerprints(dump_path, needs_decoding, repair, tables=None):
+    """Otisci svih redaka dumpa koji mogu dati popravak (needs_decoding: LinePrefilter)."""
+    result = RowFingerprints(repair, dump_fingerprint(dump_path))
+    catalog = SchemaCatalog()
+    table = None
+    with closing(iter_dump_lines(dump_path, tables=tables)) as lines:
+        for _, raw in lines:
+            raw = raw.rstrip(b'\n\r')
+            if raw.startswith(b'COPY '):
+                table, columns = parse_copy_statement(raw.decode('utf-8', errors='ignore'))
+                if table and columns and 'id' in columns:
+                    id_column_index = columns.index('id')
+                    text_columns = catalog.text_column_indexes(table, columns)
+                else:
+                    table = None
+                continue
+            if raw == b'\\.' or raw.strip() == b'\\.':
+                table = None
+                continue
+            if table is None:
+                catalog.feed_bytes(raw)
+                continue
+            if not needs_decoding(raw):
+                continue
+            fields = raw.split(b'\t')
+            if id_column_index >= len(fields):
+                continue
+            id_value = unescape_copy_field(fields[id_column_index].decode('utf-8', errors='ignore'))
+            if id_value:
+                result.add(table, id_value, row_fingerprint(raw, text_columns))
+    return result
+
+
+def load_row_fingerprints(since_path, needs_decoding, repair, tables=None):
+    """
+    Otisci za --since: datoteka s otiscima ili dump (sidecar otisci ako
+    odgovaraju dumpu, inače se grade iz dumpa i spremaju).
+    Vraća (otisci, izvor) gdje je izvor 'file', 'sidecar' ili 'built'.
+    """
+    since_path = Path(since_path)
+    if since_path.name.endswith(FINGERPRINTS_SUFFIX):
+        loaded = RowFingerprints.load(since_path)
+        if loaded is None:
+            raise ValueError(f"Neispravna datoteka s otiscima: {since_path}")
+        if loaded.repair != repair:
+            raise ValueError(f"Otisci {since_path} su nastali s drugim načinom popravka ({loaded.repair})")
+        return loaded, 'file'
+
+    sidecar = row_fingerprints_path(since_path)
+    loaded = RowFingerprints.load(sidecar)
+    if loaded is not None and loaded.key == dump_fingerprint(since_path) and loaded.repair == repair:
+        return loaded, 'sidecar'
+
+    built = build_row_fingerprints(since_path, needs_decoding, repair, tables)
+    try:
+        built.save(sidecar)
+    except OSError:
+        pass
+    return built, 'built'
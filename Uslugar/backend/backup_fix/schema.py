@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Katalog tipova kolona iz CREATE TABLE naredbi u pg_dump datoteci.
+
+pg_dump (plain format) ispisuje shemu prije podataka, pa se katalog puni
+u istom prolazu kroz datoteku prije nego što naiđe prvi COPY blok.
+"""
+
+import re
+
+# Tipovi u kojima se može pojaviti mojibake (uključujući nizove, npr. text[])
+TEXT_TYPES = {'text', 'character varying', 'varchar', 'character', 'char', 'bpchar', 'citext', 'json', 'jsonb'}
+BOOLEAN_TYPES = {'boolean', 'bool'}
+
+_CREATE_TABLE_RE = re.compile(r'CREATE\s+(?:UNLOGGED\s+)?TABLE\s+(?:ONLY\s+)?(?:"?(\w+)"?\.)?"?([^"\s(]+)"?\s*\(')
+_COLUMN_RE = re.compile(r'\s*("(?:[^"]|"")+"|[A-Za-z_][\w$]*)\s+(.+?)\s*,?\s*$')
+# Nakon tipa dolaze opcije kolone
+_TYPE_END_RE = re.compile(r'\s+(?:DEFAULT|NOT\s+NULL|NULL|COLLATE|CONSTRAINT|GENERATED|PRIMARY|REFERENCES|CHECK|UNIQUE)\b', re.I)
+_TABLE_CONSTRAINT_WORDS = {'CONSTRAINT', 'PRIMARY', 'UNIQUE', 'CHECK', 'FOREIGN', 'EXCLUDE', 'LIKE'}
+
+
+def normalize_type(sql_type):
+    """'character varying(255)' -> 'character varying', 'timestamp(3) without time zone' -> 'timestamp'."""
+    base = sql_type.strip().lower()
+    is_array = base.endswith('[]')
+    base = re.sub(r'\(.*?\)', '', base.rstrip('[]')).strip()
+    base = base.split('.')[-1].strip('"')
+    if base.startswith('timestamp'):
+        base = 'timestamp'
+    elif base.startswith('time '):
+        base = 'time'
+    return base + '[]' if is_array else base
+
+
+class SchemaCatalog:
+    """
+    Tablica -> {kolona: normalizirani tip}.
+
+    feed_bytes()/feed() primaju retke dumpa redom; prepoznaju se samo
+    CREATE TABLE blokovi, ostali retci se odmah preskaču.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self._current = None
+
+    def feed_bytes(self, raw):
+        """Kao feed(), ali za sirovi redak (dekodira se samo ako je dio CREATE TABLE)."""
+        if self._current is None and not raw.startswith(b'CREATE '):
+            return
+        self.feed(raw.decode('utf-8', errors='ignore'))
+
+    def feed(self, line):
+        if self._current is None:
+            if not line.startswith('CREATE '):
+                return
+            match = _CREATE_TABLE_RE.match(line)
+            # CREATE TABLE u jednom retku (pg_dump ga ne piše tako) se preskače
+            if match and not line.rstrip().endswith(');'):
+                self._current = match.group(2)
+                self.tables[self._current] = {}
+            return
+
+        stripped = line.strip()
+        if stripped.startswith(')'):
+            self._current = None
+            return
+        first_word = stripped.split(None, 1)[0].upper() if stripped else ''
+        if not stripped or first_word in _TABLE_CONSTRAINT_WORDS:
+            return
+        match = _COLUMN_RE.match(line)
+        if not match:
+            return
+        name, rest = match.groups()
+        if name.startswith('"'):
+            name = name[1:-1].replace('""', '"')
+        rest = _TYPE_END_RE.split(rest, 1)[0]
+        self.tables[self._current][name] = normalize_type(rest)
+
+    def column_types(self, table):
+        """Tipovi kolona tablice ili None ako CREATE TABLE nije u dumpu."""
+        return self.tables.get(table)
+
+    def column_type(self, table, column):
+        return self.tables.get(table, {}).get(column)
+
+    def text_column_indexes(self, table, columns):
+        """
+        Indeksi kolona (redoslijed iz COPY headera) u kojima može biti
+        mojibake. Za tablicu bez CREATE TABLE vraća sve kolone.
+        """
+        types = self.tables.get(table)
+        if not types:
+            return list(range(len(columns)))
+        return [
+            i for i, col in enumerate(columns)
+            if types.get(col) is None or types[col].rstrip('[]') in TEXT_TYPES
+        ]
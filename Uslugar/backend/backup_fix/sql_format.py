@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Formatiranje SQL literala i statementa za generirane skripte.
+"""
+
+from .schema import BOOLEAN_TYPES
+
+# E'' string: jedan str.translate prolaz umjesto niza replace-ova s placeholderima
+_E_STRING_TABLE = str.maketrans({
+    "'": "''",
+    '\\': '\\\\',
+    '\n': '\\n',
+    '\t': '\\t',
+    '\r': '\\r',
+})
+
+
+def escape_sql_string(value):
+    """
+    Escape SQL string vrijednosti.
+
+    Vrijednost s novim redom, carriage returnom, tabom ili backslash-om ide
+    u E'' sintaksu (\\n, \\r, \\t, \\\\), ostale u obični '' string; ' se
+    uvijek udvostručuje. Generirani SQL tako nema stvarnih \\n ni \\r unutar
+    literala i može se čitati redak po redak.
+    """
+    if value is None:
+        return 'NULL'
+    text = str(value)
+    if '\n' in text or '\r' in text or '\t' in text or '\\' in text:
+        return f"E'{text.translate(_E_STRING_TABLE)}'"
+    return "'" + text.replace("'", "''") + "'"
+
+
+def format_sql_values(values, column_types):
+    """Vrijednosti retka kao SQL literali (boolean prema tipu kolone, ostalo kao string)."""
+    values_list = []
+    for val, column_type in zip(values, column_types):
+        if val is None:
+            values_list.append('NULL')
+        elif column_type in BOOLEAN_TYPES:
+            values_list.append('true' if str(val).lower() == 't' else 'false')
+        else:
+            values_list.append(escape_sql_string(val))
+    return values_list
+
+
+def quote_identifier(name):
+    """camelCase kolone (ili s navodnicima) trebaju navodnike u PostgreSQL-u."""
+    if name[0].isupper() or any(c.isupper() for c in name[1:]) or '"' in name:
+        return f'"{name}"'
+    return name
+
+
+# insert = INSERT po retku, multi = višeretčani INSERT, upsert = višeretčani
+# INSERT ... ON CONFLICT (id) DO UPDATE, copy = COPY ... FROM stdin blok
+INSERT_MODES = ('insert', 'multi', 'upsert', 'copy')
+
+
+class InsertBuilder:
+    """
+    INSERT statementi za jednu tablicu.
+
+    - batch_size=1: jedan INSERT po retku
+    - batch_size>1: višeretčani INSERT ... VALUES (...), (...)
+    - upsert_key: dodaje ON CONFLICT (key) DO UPDATE SET za ostale kolone
+      (DO NOTHING ako osim ključa nema kolona)
+
+    add() vraća gotov statement kad se batch napuni, inače None;
+    flush() vraća statement za preostale retke.
+    """
+
+    def __init__(self, table_sql, columns, batch_size=1, upsert_key=None):
+        columns_str = ', '.join(quote_identifier(col) for col in columns)
+        self._prefix = f'INSERT INTO {table_sql} ({columns_str}) VALUES'
+        if upsert_key:
+            updates = ', '.join(
+                f'{quote_identifier(col)} = EXCLUDED.{quote_identifier(col)}'
+                for col in columns if col != upsert_key
+            )
+            # Prazan SET nije ispravan SQL
+            action = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+            self._suffix = f' ON CONFLICT ({quote_identifier(upsert_key)}) {action}'
+        else:
+            self._suffix = ''
+        self.batch_size = max(1, batch_size)
+        self.row_count = 0
+        self._rows = []
+
+    def add(self, values_sql):
+        """Dodaj redak (lista već formatiranih SQL literala)."""
+        self._rows.append(f"({', '.join(values_sql)})")
+        self.row_count += 1
+        if len(self._rows) >= self.batch_size:
+            return self.flush()
+        return None
+
+    def flush(self):
+        if not self._rows:
+            return None
+        if len(self._rows) == 1:
+            statement = f'{self._prefix} {self._rows[0]}{self._suffix};'
+        else:
+            suffix = f'\n{self._suffix.lstrip()}' if self._suffix else ''
+            statement = f'{self._prefix}\n' + ',\n'.join(self._rows) + f'{suffix};'
+        self._rows = []
+        return statement
+
+
+def update_statement(table_name, id_value, assignments):
+    """UPDATE "T" SET col = ..., ... WHERE id = ...; (assignments: [(kolona, vrijednost)])"""
+    set_sql = ', '.join(f'{quote_identifier(col)} = {escape_sql_string(val)}' for col, val in assignments)
+    return f'UPDATE "{table_name}" SET {set_sql} WHERE id = {escape_sql_string(id_value)};'
+
+
+# column = UPDATE po popravljenoj koloni, row = jedan UPDATE po retku,
+# batch = UPDATE ... FROM (VALUES ...) za više redaka iste tablice
+UPDATE_MODES = ('column', 'row', 'batch')
+
+
+class UpdateBuilder:
+    """
+    UPDATE statementi za popravljene vrijednosti.
+
+    add() prima sve popravke jednog retka i vraća listu gotovih statementa;
+    u batch načinu retci se skupljaju po tablici pa je lista prazna dok se
+    batch ne napuni. flush() vraća statemente za sve preostale retke.
+
+    Batch statement počinje retkom tipiziranih NULL-ova ((NULL::"T").kolona)
+    pa PostgreSQL literale u VALUES tipizira prema kolonama tablice (text,
+    varchar, jsonb, enum...). Taj redak nikad ne prolazi t.id = v.id.
+    Kolone koje retku nisu popravljene su NULL i ostaju nepromijenjene
+    kroz COALESCE (popravak nikad ne daje NULL).
+    """
+
+    def __init__(self, mode='column', batch_size=500):
+        if mode not in UPDATE_MODES:
+            raise ValueError(f"Nepoznat UPDATE način: {mode}")
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self._pending = {}
+
+    def add(self, table_name, id_value, fixes):
+        """fixes: [(kolona, popravljena vrijednost)] za jedan redak."""
+        if not fixes:
+            return []
+        if self.mode == 'column':
+            return [update_statement(table_name, id_value, [fix]) for fix in fixes]
+        if self.mode == 'row':
+            return [update_statement(table_name, id_value, fixes)]
+        rows = self._pending.setdefault(table_name, [])
+        rows.append((id_value, dict(fixes)))
+        if len(rows) >= self.batch_size:
+            return self.flush(table_name)
+        return []
+
+    def checkpoint(self):
+        """Retci koji čekaju flush() (batch način), u obliku za JSON."""
+        return {
+            table: [[id_value, list(fixes.items())] for id_value, fixes in rows]
+            for table, rows in self._pending.items()
+        }
+
+    def restore(self, state):
+        """Vrati retke spremljene s checkpoint()."""
+        self._pending = {
+            table: [(id_value, dict(fixes)) for id_value, fixes in rows]
+            for table, rows in state.items()
+        }
+
+    def flush(self, table_name=None):
+        """Statementi za preostale retke (jedne tablice ili svih)."""
+        tables = [table_name] if table_name is not None else list(self._pending)
+        statements = []
+        for table in tables:
+            rows = self._pending.pop(table, None)
+            if rows:
+                statements.append(self._batch_statement(table, rows))
+        return statements
+
+    def _batch_statement(self, table_name, rows):
+        columns = []
+        for _, fixes in rows:
+            for col in fixes:
+                if col not in columns:
+                    columns.append(col)
+        if len(rows) == 1:
+            id_value, fixes = rows[0]
+            return update_statement(table_name, id_value, list(fixes.items()))
+
+        table_sql = f'"{table_name}"'
+        quoted = [quote_identifier(col) for col in columns]
+        typed_nulls = ', '.join(f'(NULL::{table_sql}).{col}' for col in ['id'] + quoted)
+        values_rows = [f'({typed_nulls})']
+        for id_value, fixes in rows:
+            values = [escape_sql_string(id_value)] + [escape_sql_string(fixes.get(col)) for col in columns]
+            values_rows.append(f"({', '.join(values)})")
+        set_sql = ', '.join(f'{col} = COALESCE(v.{col}, t.{col})' for col in quoted)
+        return (
+            f'UPDATE {table_sql} AS t SET {set_sql}\n'
+            f'FROM (VALUES\n' + ',\n'.join(values_rows) + '\n'
+            f') AS v(id, {", ".join(quoted)})\n'
+            f'WHERE t.id = v.id;'
+        )
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite staging kopija tablica iz dumpa za brze upite i ciljano generiranje.
+
+import_dump() jednom prolazi kroz dump (isti parser kao skripte) i svaku
+COPY sekciju sprema u istoimenu SQLite tablicu: kolone iz COPY headera s
+tipom iz CREATE TABLE (INTEGER/REAL/BLOB/TEXT), uz broj retka u dumpu i
+sirovi COPY redak. Retci se upisuju u batchevima, a indeks na id se
+gradi nakon punjenja. Shema (SchemaCatalog) i originalne COPY naredbe
+spremaju se u meta tablice.
+
+iter_staged_lines() iz staging datoteke vraća retke u obliku plain dumpa
+(COPY / sirovi retci / \\.) filtrirane po tablici, skupu id-eva ili LIKE
+uzorku na koloni, pa generatori (fanout sinkovi) daju isti izlaz kao iz
+dumpa, a čitaju samo tražene retke:
+    python -m backup_fix.staging backup.sql backup.sqlite
+    python GENERATE-FROM-BACKUP.py backup.sqlite --update UPDATE.sql --tables Category --like name=%┼%
+    sqlite3 backup.sqlite "SELECT id, name FROM Category WHERE name LIKE '%┼%'"
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from .copy_format import decode_copy_line, parse_copy_statement
+from .dump_index import dump_fingerprint, iter_dump_lines
+from .fanout import scan_lines, wanted_tables
+from .schema import BOOLEAN_TYPES, SchemaCatalog
+
+STAGING_VERSION = 1
+SQLITE_MAGIC = b'SQLite format 3\0'
+
+META_TABLE = '_backup_fix_meta'
+TABLES_TABLE = '_backup_fix_tables'
+# Broj retka u dumpu i sirovi COPY redak (izlaz generatora je isti kao iz dumpa)
+LINE_COLUMN = '_dump_line'
+RAW_COLUMN = '_dump_raw'
+
+_INTEGER_TYPES = {'smallint', 'integer', 'bigint', 'int', 'int2', 'int4', 'int8', 'serial', 'bigserial', 'smallserial'}
+_REAL_TYPES = {'real', 'double precision', 'float4', 'float8', 'numeric', 'decimal'}
+
+
+def _ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def sqlite_type(pg_type):
+    """Normalizirani PostgreSQL tip (SchemaCatalog) -> SQLite tip kolone."""
+    if pg_type is None or pg_type.endswith('[]'):
+        return 'TEXT'
+    if pg_type in _INTEGER_TYPES or pg_type in BOOLEAN_TYPES:
+        return 'INTEGER'
+    if pg_type in _REAL_TYPES:
+        return 'REAL'
+    if pg_type == 'bytea':
+        return 'BLOB'
+    return 'TEXT'
+
+
+def _converter(pg_type):
+    """Funkcija COPY vrijednost (str) -> SQLite vrijednost; neispravna vrijednost ostaje string."""
+    if pg_type in BOOLEAN_TYPES:
+        return lambda value: {'t': 1, 'f': 0}.get(value, value)
+    kind = sqlite_type(pg_type)
+    if kind == 'INTEGER':
+        cast = int
+    elif kind == 'REAL':
+        cast = float
+    elif kind == 'BLOB':
+        def cast(value):
+            return bytes.fromhex(value[2:]) if value.startswith('\\x') else value.encode('utf-8')
+    else:
+        return None
+
+    def convert(value):
+        try:
+            return cast(value)
+        except ValueError:
+            return value
+    return convert
+
+
+def is_staging_file(path):
+    """Je li path SQLite datoteka (staging iz import_dump)."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    except OSError:
+        return False
+
+
+class _TableLoader:
+    """Batch INSERT redaka jedne COPY sekcije."""
+
+    def __init__(self, conn, table, columns, catalog, batch_rows):
+        self.conn = conn
+        self.columns = columns
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self.bad_rows = 0
+        self._batch = []
+        types = catalog.column_types(table) or {}
+        self._converters = [_converter(types.get(column)) for column in columns]
+        table_sql = _ident(table)
+        column_defs = ', '.join(f'{_ident(column)} {sqlite_type(types.get(column))}' for column in columns)
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {table_sql} ({column_defs}, {LINE_COLUMN} INTEGER, {RAW_COLUMN} BLOB)'
+        )
+        placeholders = ', '.join('?' * (len(columns) + 2))
+        self._insert_sql = f'INSERT INTO {table_sql} VALUES ({placeholders})'
+
+    def add(self, line_num, raw):
+        try:
+            values = decode_copy_line(raw.decode('utf-8', errors='ignore'))
+        except (ValueError, UnicodeDecodeError):
+            # Npr. oktalni escape koji ne daje ispravan UTF-8 (\377)
+            values = None
+        if values is None or len(values) != len(self.columns):
+            # Sirovi redak se čuva; tipizirane kolone ostaju NULL
+            self.bad_rows += 1
+            values = [None] * len(self.columns)
+        else:
+            values = [
+                convert(value) if convert is not None and value is not None else value
+                for convert, value in zip(self._converters, values)
+            ]
+        values.append(line_num)
+        values.append(raw)
+        self._batch.append(values)
+        self.rows += 1
+        if len(self._batch) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            self.conn.executemany(self._insert_sql, self._batch)
+            self._batch = []
+
+
+def import_dump(dump_path, db_path, tables=None, batch_rows=10000, use_index=True):
+    """
+    Dump -> SQLite staging datoteka (postojeća se zamjenjuje tek kad je nova
+    potpuna). tables: samo ove tablice (None = sve). Vraća
+    {'path', 'tables': {tablica: broj redaka}, 'rows', 'bad_rows'}.
+    """
+    db_path = Path(db_path)
+    tmp = db_path.with_name(db_path.name + '.tmp')
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(tmp)
+    info = {'path': str(db_path), 'tables': {}, 'rows': 0, 'bad_rows': 0}
+    try:
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute(f'CREATE TABLE {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)')
+        conn.execute(
+            f'CREATE TABLE {TABLES_TABLE} (position INTEGER PRIMARY KEY, name TEXT, copy TEXT, '
+            f'columns TEXT, rows INTEGER)'
+        )
+        catalog = SchemaCatalog()
+        in_copy = False
+        loader = None
+        loaders = {}
+        sections = []
+        with closing(iter_dump_lines(dump_path, tables=tables, use_index=use_index)) as lines:
+            for line_num, raw in lines:
+                raw = raw.rstrip(b'\n\r')
+                if raw.startswith(b'COPY '):
+                    in_copy = True
+                    copy_line = raw.decode('utf-8', errors='ignore')
+                    table, columns = parse_copy_statement(copy_line)
+                    if table and columns and (tables is None or table in tables):
+                        loader = loaders.get(table)
+                        if loader is None:
+                            loader = loaders[table] = _TableLoader(conn, table, columns, catalog, batch_rows)
+                        elif loader.columns != columns:
+                            raise ValueError(f"Tablica {table} se u dumpu pojavljuje s različitim kolonama")
+                        sections.append([table, copy_line, columns, loader.rows])
+                        print(f"  [INFO] Tablica: {table}, {len(columns)} kolona")
+                    continue
+                if raw == b'\\.' or raw.strip() == b'\\.':
+                    if loader is not None:
+                        loader.flush()
+                        sections[-1][3] = loader.rows - sections[-1][3]
+                        loader = None
+                    in_copy = False
+                    continue
+                # Izvan COPY bloka - CREATE TABLE ide u katalog tipova
+                if not in_copy:
+                    catalog.feed_bytes(raw)
+                    continue
+                if loader is not None:
+                    loader.add(line_num, raw)
+        if loader is not None:
+            loader.flush()
+            sections[-1][3] = loader.rows - sections[-1][3]
+
+        conn.executemany(
+            f'INSERT INTO {TABLES_TABLE} (name, copy, columns, rows) VALUES (?, ?, ?, ?)',
+            [(table, copy_line, json.dumps(columns), rows) for table, copy_line, columns, rows in sections],
+        )
+        for table, loader in loaders.items():
+            if 'id' in loader.columns:
+                conn.execute(f'CREATE INDEX {_ident(table + "_id_idx")} ON {_ident(table)} (id)')
+            info['tables'][table] = loader.rows
+            info['rows'] += loader.rows
+            info['bad_rows'] += loader.bad_rows
+        conn.executemany(f'INSERT INTO {META_TABLE} VALUES (?, ?)', [
+            ('version', json.dumps(STAGING_VERSION)),
+            ('dump', json.dumps(str(dump_path))),
+            ('dump_fingerprint', json.dumps(dump_fingerprint(dump_path))),
+            ('schema', json.dumps(catalog.tables, ensure_ascii=False)),
+        ])
+        conn.commit()
+    except BaseException:
+        conn.close()
+        tmp.unlink()
+        raise
+    conn.close()
+    os.replace(tmp, db_path)
+    return info
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(f'file:{Path(db_path).resolve().as_posix()}?mode=ro', uri=True)
+    try:
+        meta = dict(conn.execute(f'SELECT key, value FROM {META_TABLE}'))
+    except sqlite3.DatabaseError:
+        conn.close()
+        raise ValueError(f"{db_path} nije staging datoteka (backup_fix.staging)")
+    if json.loads(meta.get('version', 'null')) != STAGING_VERSION:
+        conn.close()
+        raise ValueError(f"{db_path}: staging datoteka je druge verzije - ponovi import")
+    return conn, {key: json.loads(value) for key, value in meta.items()}
+
+
+def load_staging_catalog(db_path):
+    """SchemaCatalog iz CREATE TABLE naredbi dumpa iz kojeg je staging napravljen."""
+    conn, meta = _connect(db_path)
+    conn.close()
+    catalog = SchemaCatalog()
+    catalog.tables = meta['schema']
+    return catalog
+
+
+def iter_staged_lines(db_path, tables=None, ids=None, like=None):
+    """
+    (broj retka, sirovi redak) u obliku plain dumpa iz staging datoteke,
+    redom kao u dumpu: COPY naredba, retci sekcije, '\\.'.
+    tables: samo ove tablice; ids: samo retci s tim id-em (tablice bez id
+    kolone se preskaču); like: (kolona, uzorak) - samo retci gdje je
+    kolona LIKE uzorak (SQLite LIKE, bez razlike velikih i malih ASCII
+    slova), tablice bez te kolone se preskaču.
+    """
+    conn, meta = _connect(db_path)
+    with closing(conn):
+        sections = conn.execute(f'SELECT name, copy, columns, rows FROM {TABLES_TABLE} ORDER BY position').fetchall()
+        offsets = {}
+        for table, copy_line, columns_json, rows in sections:
+            offset = offsets.get(table, 0)
+            offsets[table] = offset + rows
+            if tables is not None and table not in tables:
+                continue
+            columns = json.loads(columns_json)
+            conditions = []
+            params = []
+            if ids is not None:
+                if 'id' not in columns:
+                    continue
+                id_type = sqlite_type(meta['schema'].get(table, {}).get('id'))
+                converter = _converter('integer') if id_type == 'INTEGER' else None
+                conditions.append('id IN (SELECT value FROM json_each(?))')
+                params.append(json.dumps([converter(value) if converter else value for value in ids]))
+            if like is not None:
+                column, pattern = like
+                if column not in columns:
+                    continue
+                conditions.append(f'{_ident(column)} LIKE ?')
+                params.append(pattern)
+            where = ' AND '.join(conditions) or '1'
+            # Ista tablica u više COPY sekcija: retci sekcije su rowid-ovi offset+1 .. offset+rows
+            query = (
+                f'SELECT {LINE_COLUMN}, {RAW_COLUMN} FROM {_ident(table)} '
+                f'WHERE rowid > ? AND rowid <= ? AND {where} ORDER BY rowid'
+            )
+            yield 0, copy_line.encode('utf-8') + b'\n'
+            for line_num, raw in conn.execute(query, [offset, offset + rows] + params):
+                yield line_num, raw + b'\n'
+            yield 0, b'\\.\n'
+
+
+def scan_staging(db_path, sinks, tables=None, ids=None, like=None, strict=False):
+    """
+    Kao fanout.scan_dump, ali iz staging datoteke: čitaju se samo retci
+    tablica koje sinkovi žele (i tables), s id-em iz ids i kolonom LIKE like.
+    """
+    wanted = wanted_tables(sinks)
+    if tables is not None:
+        wanted = set(tables) if wanted is None else wanted & set(tables)
+    lines = iter_staged_lines(db_path, tables=wanted, ids=ids, like=like)
+    return scan_lines(lines, sinks, catalog=load_staging_catalog(db_path), strict=strict)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import dumpa u SQLite staging datoteku')
+    parser.add_argument('backup_file', help='Backup: pg_dump plain format (moze biti .gz/.zst), custom arhiva (-Fc) ili direktorij (-Fd)')
+    parser.add_argument('output', help='SQLite datoteka (npr. backup.sqlite)')
+    parser.add_argument('--tables', default=None, help='Samo ove tablice, odvojene zarezom (default: sve)')
+    parser.add_argument('--batch-rows', type=int, default=10000, help='Broj redaka po batch INSERT-u')
+    parser.add_argument(
+        '--no-index',
+        action='store_true',
+        help='Ne koristi indeks COPY sekcija (<dump>.index.json), citaj cijelu datoteku',
+    )
+    args = parser.parse_args()
+
+    tables = [table.strip() for table in args.tables.split(',') if table.strip()] if args.tables else None
+    info = import_dump(args.backup_file, args.output, tables=tables, batch_rows=args.batch_rows,
+                       use_index=not args.no_index)
+    for table, rows in info['tables'].items():
+        print(f"  [OK] {table}: {rows} redaka")
+    if info['bad_rows']:
+        print(f"[WARNING] {info['bad_rows']} redaka s pogresnim brojem kolona (spremljen samo sirovi redak)")
+    print(f"[OK] {info['rows']} redaka u {len(info['tables'])} tablica spremljeno u: {info['path']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Statistika obrade dumpa za --stats out.json.
+
+RunStats skuplja brojače po tablici i koloni, pogotke po uzorku iz
+PROBLEMATIC_PATTERNS (codec tablica: 'codec:<artefakt>') i vrijeme po
+fazama (čitanje, parsiranje, popravak, zapis). Sadrži samo obične
+dict/float vrijednosti pa se može vratiti iz worker procesa i zbrojiti
+s merge().
+"""
+
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PHASES = ('read', 'parse', 'repair', 'write')
+
+
+def peak_rss_mb():
+    """Vršna memorija procesa i (najvećeg) child procesa u MB ili None."""
+    if resource is None:
+        return None
+    # ru_maxrss je u KB na Linuxu, u bajtovima na macOS-u
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit
+    return {'process': own, 'children': children}
+
+
+class RunStats:
+    """Brojači i vremena jedne obrade (ili jednog paralelnog dijela)."""
+
+    def __init__(self):
+        self.tables = {}
+        self.patterns = {}
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.bytes_read = 0
+        self._started = time.perf_counter()
+
+    def table(self, name):
+        entry = self.tables.get(name)
+        if entry is None:
+            entry = self.tables[name] = {
+                'rows': 0,
+                'bytes': 0,
+                'changed_rows': 0,
+                'changed_values': 0,
+                'columns': {},
+            }
+        return entry
+
+    def add_fix(self, entry, column, pattern_counts):
+        """Jedna popravljena vrijednost kolone (pattern_counts: engine.match_counts())."""
+        entry['changed_values'] += 1
+        entry['columns'][column] = entry['columns'].get(column, 0) + 1
+        for pattern, count in pattern_counts.items():
+            self.patterns[pattern] = self.patterns.get(pattern, 0) + count
+
+    def timed(self, phase, func):
+        """func omotan tako da se njegovo vrijeme dodaje fazi `phase`."""
+        times = self.times
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                times[phase] += time.perf_counter() - start
+        return wrapper
+
+    def timed_iter(self, iterable, phase='read'):
+        """Elementi iterable-a; vrijeme čekanja na svaki ide u fazu `phase`."""
+        iterator = iter(iterable)
+        times = self.times
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                times[phase] += time.perf_counter() - start
+            yield item
+
+    def merge(self, other):
+        """Dodaj brojače i vremena drugog RunStats-a (npr. iz worker procesa)."""
+        for name, other_entry in other.tables.items():
+            entry = self.table(name)
+            for key in ('rows', 'bytes', 'changed_rows', 'changed_values'):
+                entry[key] += other_entry[key]
+            for column, count in other_entry['columns'].items():
+                entry['columns'][column] = entry['columns'].get(column, 0) + count
+        for pattern, count in other.patterns.items():
+            self.patterns[pattern] = self.patterns.get(pattern, 0) + count
+        for phase, seconds in other.times.items():
+            self.times[phase] += seconds
+        self.bytes_read += other.bytes_read
+
+    def report(self, **extra):
+        """Rječnik za JSON: ukupno, propusnost, faze, tablice, uzorci (najčešći prvi)."""
+        elapsed = time.perf_counter() - self._started
+        rows = sum(entry['rows'] for entry in self.tables.values())
+        measured = sum(self.times.values())
+        result = dict(extra)
+        result.update({
+            'elapsed_s': elapsed,
+            'rows': rows,
+            'bytes_read': self.bytes_read,
+            'rows_per_s': rows / elapsed if elapsed else None,
+            'mb_per_s': self.bytes_read / (1024 * 1024) / elapsed if elapsed else None,
+            'peak_rss_mb': peak_rss_mb(),
+            'phases': {
+                phase: {'seconds': seconds, 'share': seconds / measured if measured else 0.0}
+                for phase, seconds in self.times.items()
+            },
+            'tables': {
+                name: dict(entry, columns=dict(sorted(entry['columns'].items(), key=lambda item: -item[1])))
+                for name, entry in self.tables.items()
+            },
+            'patterns': dict(sorted(self.patterns.items(), key=lambda item: -item[1])),
+        })
+        return result
+
+    def write(self, path, **extra):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(**extra), f, ensure_ascii=False, indent=2)
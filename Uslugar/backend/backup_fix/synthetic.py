@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Generator sintetičkih pg_dump datoteka (plain format) za testiranje i
+benchmark skripti bez produkcijskog dumpa.
+
+Pokretanje (iz Uslugar/backend):
+    python -m backup_fix.synthetic dump.sql --size-mb 50 --tables 6 --columns 5 \\
+        --mojibake 0.05 --mix cp852=0.6,cp1250=0.2,markers=0.1,newline=0.1
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+from .copy_format import encode_copy_line
+
+# Vrste oštećenja: UTF-8 pročitan kao codec, '<|'/'|>' umjesto 'ž', literalni \n
+MOJIBAKE_KINDS = ('cp852', 'cp1250', 'cp1252', 'markers', 'newline')
+DEFAULT_MIX = {'cp852': 0.6, 'cp1250': 0.2, 'markers': 0.1, 'newline': 0.1}
+
+# Prva tablica je uvijek Category (GENERATE-INSERT-CATEGORY.py)
+TABLE_NAMES = ('Category', 'Job', 'Offer', 'User', 'ProviderProfile', 'Review', 'Invoice', 'Notification')
+
+_WORDS = (
+    'Vodoinstalater', 'Električar', 'Keramičar', 'Soboslikar', 'Ličilac', 'Zidar',
+    'Čišćenje', 'Žbukanje', 'Građevinski', 'radovi', 'popravak', 'kućanskih', 'aparata',
+    'montaža', 'klima', 'uređaja', 'Zagreb', 'Šibenik', 'Đakovo', 'Čakovec', 'Požega',
+    'hitno', 'ponuda', 'usluga', 'kupaonice', 'održavanje', 'vrt', 'selidba', 'stolarija',
+    'izrada', 'namještaja', 'ZAVRŠEN', 'ugovor', 'račun', 'obrtnik', 'licenca',
+)
+
+_PREAMBLE = """--
+-- PostgreSQL database dump
+--
+
+-- Dumped from database version 16.2
+-- Dumped by pg_dump version 16.2
+
+SET statement_timeout = 0;
+SET lock_timeout = 0;
+SET client_encoding = 'UTF8';
+SET standard_conforming_strings = on;
+SELECT pg_catalog.set_config('search_path', '', false);
+SET check_function_bodies = false;
+
+SET default_tablespace = '';
+
+SET default_table_access_method = heap;
+
+"""
+
+
+def parse_mix(text):
+    """'cp852=0.6,markers=0.4' -> {'cp852': 0.6, 'markers': 0.4}"""
+    mix = {}
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind not in MOJIBAKE_KINDS:
+            raise ValueError(f"Nepoznata vrsta oštećenja: {kind} (moguće: {', '.join(MOJIBAKE_KINDS)})")
+        mix[kind] = float(weight) if weight else 1.0
+    return mix
+
+
+def garble(text, kind):
+    """Oštećenje teksta kakvo se nalazi u backupima."""
+    if kind == 'markers':
+        return text.replace('ž', '<|').replace('Ž', '|>') if 'ž' in text or 'Ž' in text else text + ' <|'
+    if kind == 'newline':
+        return text.replace(' ', '\\n', 1)
+    out = []
+    for char in text:
+        if char.isascii():
+            out.append(char)
+            continue
+        try:
+            out.append(char.encode('utf-8').decode(kind))
+        except UnicodeDecodeError:
+            out.append(char)
+    return ''.join(out)
+
+
+class _RowFactory:
+    def __init__(self, rng, mojibake_ratio, mix, escape_ratio, null_ratio):
+        self.rng = rng
+        self.mojibake_ratio = mojibake_ratio
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.escape_ratio = escape_ratio
+        self.null_ratio = null_ratio
+        self.mojibake_values = 0
+
+    def text(self, min_words, max_words, nullable=True):
+        rng = self.rng
+        if nullable and rng.random() < self.null_ratio:
+            return None
+        value = ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(min_words, max_words)))
+        if rng.random() < self.escape_ratio:
+            # Stvarni novi red, tab ili backslash -> escape u COPY formatu
+            value += rng.choice(('\nDrugi red', '\tkolona', ' C:\\temp'))
+        if self.kinds and rng.random() < self.mojibake_ratio:
+            garbled = garble(value, rng.choices(self.kinds, self.weights)[0])
+            if garbled != value:
+                self.mojibake_values += 1
+            value = garbled
+        return value
+
+    def row(self, n, text_columns):
+        rng = self.rng
+        values = [f'{n:08x}-{rng.getrandbits(16):04x}-4{rng.getrandbits(12):03x}-8{rng.getrandbits(12):03x}-{rng.getrandbits(48):012x}']
+        values.append(self.text(1, 3, nullable=False))  # name je NOT NULL
+        values.append(self.text(5, 25))
+        values.extend(self.text(1, 8) for _ in range(text_columns - 2))
+        values.append(f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:{rng.randint(0, 59):02d}:00.000')
+        values.append('t' if rng.random() < 0.8 else 'f')
+        values.append(None if rng.random() < self.null_ratio else str(rng.randint(1, 100000)))
+        return values
+
+
+def _columns(text_columns):
+    columns = [('id', 'text NOT NULL'), ('name', 'text NOT NULL'), ('description', 'text')]
+    columns.extend((f'note{i}', 'character varying(255)') for i in range(1, text_columns - 1))
+    columns.extend([
+        ('createdAt', 'timestamp(3) without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL'),
+        ('isActive', 'boolean DEFAULT true NOT NULL'),
+        ('amount', 'integer'),
+    ])
+    return columns
+
+
+def _quote(name):
+    return f'"{name}"' if name != name.lower() else name
+
+
+def generate_dump(
+    path,
+    size_mb=10,
+    tables=4,
+    text_columns=4,
+    mojibake_ratio=0.05,
+    mix=None,
+    escape_ratio=0.05,
+    null_ratio=0.1,
+    seed=1,
+):
+    """
+    Zapiši sintetički dump od ~size_mb MB i vrati opis (retci po tablici,
+    broj oštećenih vrijednosti, veličina).
+
+    Svaka tablica ima id, name, description, text_columns-2 varchar kolona
+    te timestamp, boolean i integer kolonu. mojibake_ratio je udio
+    tekstualnih vrijednosti s oštećenjem (vrsta prema mix težinama),
+    escape_ratio udio s novim redom/tabom/backslash-om, null_ratio udio NULL-ova.
+    """
+    if not 1 <= tables <= len(TABLE_NAMES):
+        raise ValueError(f"Broj tablica mora biti od 1 do {len(TABLE_NAMES)}")
+    text_columns = max(2, text_columns)
+    rng = random.Random(seed)
+    factory = _RowFactory(rng, mojibake_ratio, DEFAULT_MIX if mix is None else mix, escape_ratio, null_ratio)
+    names = TABLE_NAMES[:tables]
+    columns = _columns(text_columns)
+    table_bytes = int(size_mb * 1024 * 1024 / tables)
+    rows = {}
+
+    path = Path(path)
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(_PREAMBLE)
+        for name in names:
+            f.write(f'--\n-- Name: {name}; Type: TABLE; Schema: public; Owner: -\n--\n\n')
+            f.write(f'CREATE TABLE public."{name}" (\n')
+            f.write(',\n'.join(f'    {_quote(col)} {sql_type}' for col, sql_type in columns))
+            f.write('\n);\n\n\n')
+
+        column_list = ', '.join(_quote(col) for col, _ in columns)
+        n = 0
+        for name in names:
+            f.write(f'--\n-- Data for Name: {name}; Type: TABLE DATA; Schema: public; Owner: -\n--\n\n')
+            f.write(f'COPY public."{name}" ({column_list}) FROM stdin;\n')
+            written = 0
+            count = 0
+            while written < table_bytes:
+                line = encode_copy_line(factory.row(n, text_columns)) + '\n'
+                f.write(line)
+                written += len(line.encode('utf-8'))
+                count += 1
+                n += 1
+            f.write('\\.\n\n\n')
+            rows[name] = count
+
+        for name in names:
+            f.write(f'--\n-- Name: {name} {name}_pkey; Type: CONSTRAINT; Schema: public; Owner: -\n--\n\n')
+            f.write(f'ALTER TABLE ONLY public."{name}"\n    ADD CONSTRAINT "{name}_pkey" PRIMARY KEY (id);\n\n\n')
+        f.write('--\n-- PostgreSQL database dump complete\n--\n\n')
+
+    return {
+        'path': str(path),
+        'bytes': path.stat().st_size,
+        'rows': sum(rows.values()),
+        'tables': rows,
+        'mojibake_values': factory.mojibake_values,
+    }
+
+
+def add_generator_arguments(parser, escape_ratio=0.05):
+    """Opcije generatora (dijeli ih i backup_fix.bench)."""
+    parser.add_argument('--size-mb', type=float, default=10, help='Približna veličina dumpa u MB')
+    parser.add_argument('--tables', type=int, default=4, help=f'Broj tablica (1-{len(TABLE_NAMES)}, prva je Category)')
+    parser.add_argument('--columns', type=int, default=4, help='Broj tekstualnih kolona po tablici (min 2)')
+    parser.add_argument('--mojibake', type=float, default=0.05, help='Udio tekstualnih vrijednosti s oštećenim encodingom')
+    parser.add_argument(
+        '--mix',
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help=f"Vrste oštećenja s težinama, npr. cp852=0.6,markers=0.4 (moguće: {', '.join(MOJIBAKE_KINDS)})",
+    )
+    parser.add_argument('--escape-ratio', type=float, default=escape_ratio, help='Udio vrijednosti s novim redom/tabom/backslash-om')
+    parser.add_argument('--null-ratio', type=float, default=0.1, help='Udio NULL vrijednosti')
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def generator_kwargs(args):
+    return {
+        'size_mb': args.size_mb,
+        'tables': args.tables,
+        'text_columns': args.columns,
+        'mojibake_ratio': args.mojibake,
+        'mix': args.mix,
+        'escape_ratio': args.escape_ratio,
+        'null_ratio': args.null_ratio,
+        'seed': args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generator sintetičkog pg_dump-a (plain format)')
+    parser.add_argument('output', help='Izlazna .sql datoteka')
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    info = generate_dump(args.output, **generator_kwargs(args))
+    print(
+        f"[OK] {info['path']}: {info['bytes'] / (1024 * 1024):.1f} MB, {info['rows']} redaka "
+        f"u {len(info['tables'])} tablica, {info['mojibake_values']} oštećenih vrijednosti"
+    )
+
+
+if __name__ == '__main__':
+    main()
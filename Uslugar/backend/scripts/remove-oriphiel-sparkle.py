@@ -3,9 +3,19 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
 from pathlib import Path
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from PIL import Image, ImageDraw, ImageFilter
 
 DEFAULT_ASSETS = Path(r"C:\ORIPHIEL\output\oriphiel-ad-assets")
@@ -18,6 +28,13 @@ DEFAULT_NAMES = [
 
 IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".jfif", ".webp"}
 
+# Predložak na najgrubljoj razini piramide ne smije biti manji od ovoga (px)
+MIN_PYRAMID_SIDE = 6
+MAX_PYRAMID_LEVELS = 4
+
+CACHE_VERSION = 1
+CACHE_NAME = ".sparkle-cache.json"
+
 
 def list_all_images(assets: Path) -> list[Path]:
     """Sve slike u mapi osim backupa."""
@@ -46,86 +63,364 @@ def roi_ratios_for(path: Path) -> tuple[float, float, float, float]:
     return (0.0, 1.0, 0.12, 1.0)
 
 
-def ncc_score(patch: np.ndarray, tpl: np.ndarray) -> float:
-    a = patch.astype(np.float64) - patch.mean()
+def _fft_size(n: int) -> int:
+    """Najmanji 2^a·3^b·5^c >= n (za takve dimenzije FFT je najbrži)."""
+    best = 1 << max(0, (n - 1).bit_length())
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            size = p35
+            while size < n:
+                size *= 2
+            best = min(best, size)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _summed_area(a: np.ndarray) -> np.ndarray:
+    """Summed-area tabla s nultim prvim retkom i stupcem."""
+    sat = np.zeros((a.shape[0] + 1, a.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(a, axis=0, dtype=np.float64), axis=1, out=sat[1:, 1:])
+    return sat
+
+
+def _window_sums(sat: np.ndarray, th: int, tw: int) -> np.ndarray:
+    """Zbroj svakog th×tw prozora iz summed-area table, oblik (H-th+1, W-tw+1)."""
+    return sat[th:, tw:] - sat[:-th, tw:] - sat[th:, :-tw] + sat[:-th, :-tw]
+
+
+def _ncc_scores(num: np.ndarray, s1: np.ndarray, s2: np.ndarray, n: int, tpl: np.ndarray) -> np.ndarray:
+    """
+    NCC iz brojnika Σ(prozor·centrirani predložak) i zbrojeva prozora
+    Σx, Σx² (n piksela); ravan prozor daje 0.
+    """
     b = tpl - tpl.mean()
-    da = np.sqrt((a * a).sum()) + 1e-6
     db = np.sqrt((b * b).sum()) + 1e-6
-    return float((a * b).sum() / (da * db))
+    var = np.maximum(s2 - s1 * s1 / n, 0.0)
+    scores = num / ((np.sqrt(var) + 1e-6) * db)
+    # Ravan prozor - brojnik je tu samo šum zaokruživanja
+    scores[var < 1e-4 * n] = 0.0
+    return np.clip(scores, -1.0, 1.0)
+
+
+class NccCorrelator:
+    """
+    Normalizirana kros-korelacija za svaki položaj predloška unutar iste regije:
+    brojnik je FFT kros-korelacija s centriranim predloškom, a srednje
+    vrijednosti i norme prozora dolaze iz summed-area tablica. FFT regije i
+    tablice računaju se jednom pa je svaki sljedeći predložak (do max_th ×
+    max_tw) samo jedan FFT predloška i jedan inverzni FFT.
+    """
+
+    def __init__(self, region: np.ndarray, max_th: int, max_tw: int):
+        H, W = region.shape
+        # NCC ne ovisi o pomaku svjetline - centriranje smanjuje grešku zaokruživanja u FFT-u
+        self.region = region - region.mean()
+        self.shape = (_fft_size(H + max_th - 1), _fft_size(W + max_tw - 1))
+        self.spec = np.fft.rfft2(self.region, self.shape)
+        self.sat1 = _summed_area(self.region)
+        self.sat2 = _summed_area(self.region * self.region)
+
+    def scores(self, tpl: np.ndarray) -> np.ndarray:
+        th, tw = tpl.shape
+        H, W = self.region.shape
+        b = tpl - tpl.mean()
+        spec = self.spec * np.fft.rfft2(b[::-1, ::-1], self.shape)
+        num = np.fft.irfft2(spec, self.shape)[th - 1 : H, tw - 1 : W]
+        s1 = _window_sums(self.sat1, th, tw)
+        s2 = _window_sums(self.sat2, th, tw)
+        return _ncc_scores(num, s1, s2, th * tw, tpl)
+
+
+def ncc_window(region: np.ndarray, tpl: np.ndarray) -> np.ndarray:
+    """
+    Isto što i NccCorrelator.scores, ali izravno (bez FFT-a) - brže kad je
+    položaja malo, kao kod dorade kandidata u okolini ±2 px.
+    """
+    tpl = tpl.astype(np.float64)
+    windows = sliding_window_view(region.astype(np.float64), tpl.shape)
+    num = np.einsum("ijkl,kl->ij", windows, tpl - tpl.mean())
+    s1 = windows.sum(axis=(2, 3))
+    s2 = np.einsum("ijkl,ijkl->ij", windows, windows)
+    return _ncc_scores(num, s1, s2, tpl.size, tpl)
+
+
+@dataclass
+class TemplateVariant:
+    """Skalirani/zarotirani predložak i njegova piramida (razina L = 1/2^L)."""
+
+    scale: float
+    angle: float
+    pyramid: list[np.ndarray] = field(default_factory=list)
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self.pyramid[0]
+
+
+@dataclass
+class Match:
+    score: float
+    x: int
+    y: int
+    w: int
+    h: int
+    scale: float = 1.0
+    angle: float = 0.0
+
+
+def _downsample(a: np.ndarray) -> np.ndarray:
+    """Pola rezolucije (prosjek 2×2 bloka)."""
+    h, w = a.shape[0] // 2, a.shape[1] // 2
+    return a[: h * 2, : w * 2].reshape(h, 2, w, 2).mean(axis=(1, 3))
+
+
+def pyramid_levels(min_side: int, requested: int = -1) -> int:
+    """Broj razina ispod pune rezolucije (-1 = automatski prema MIN_PYRAMID_SIDE)."""
+    if requested >= 0:
+        return requested
+    levels = 0
+    while levels < MAX_PYRAMID_LEVELS and min_side / 2 ** (levels + 1) >= MIN_PYRAMID_SIDE:
+        levels += 1
+    return levels
+
+
+def build_template_bank(
+    tpl: Image.Image,
+    scales: list[float],
+    angles: list[float],
+    levels: int = -1,
+) -> tuple[list[TemplateVariant], int]:
+    """
+    Predložak u svim kombinacijama skale i kuta (rotacija oko središta,
+    uglovi se pune medijanom ruba predloška). Vraća (varijante, razine).
+    """
+    tpl = tpl.convert("L")
+    border = np.concatenate([
+        np.asarray(tpl)[0], np.asarray(tpl)[-1], np.asarray(tpl)[:, 0], np.asarray(tpl)[:, -1],
+    ])
+    fill = int(np.median(border))
+    images = []
+    for scale in scales:
+        size = (max(3, round(tpl.width * scale)), max(3, round(tpl.height * scale)))
+        scaled = tpl if scale == 1.0 else tpl.resize(size, Image.Resampling.LANCZOS)
+        for angle in angles:
+            rotated = scaled if angle == 0 else scaled.rotate(
+                angle, resample=Image.Resampling.BICUBIC, fillcolor=fill,
+            )
+            images.append((scale, angle, rotated))
+    levels = pyramid_levels(min(min(im.size) for _, _, im in images), levels)
+    bank = []
+    for scale, angle, im in images:
+        pyramid = [np.asarray(im, dtype=np.float32)]
+        for _ in range(levels):
+            pyramid.append(_downsample(pyramid[-1]))
+        bank.append(TemplateVariant(scale, angle, pyramid))
+    return bank, levels
+
 
+def _top_peaks(scores: np.ndarray, k: int, radius: int) -> list[tuple[float, int, int]]:
+    """Do k najboljih (score, x, y) s potiskivanjem susjeda unutar radius."""
+    scores = scores.copy()
+    peaks = []
+    for _ in range(k):
+        iy, ix = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        best = float(scores[iy, ix])
+        if best <= -1.0:
+            break
+        peaks.append((best, int(ix), int(iy)))
+        scores[max(0, iy - radius) : iy + radius + 1, max(0, ix - radius) : ix + radius + 1] = -1.0
+    return peaks
 
-def find_best_match(
-    gray: np.ndarray,
-    tpl: np.ndarray,
-    coarse: int = 8,
+
+def roi_window(
+    width: int,
+    height: int,
+    bank: list[TemplateVariant],
     y_min_ratio: float = 0.0,
     y_max_ratio: float = 1.0,
     x_min_ratio: float = 0.0,
     x_max_ratio: float = 1.0,
-) -> tuple[float, int, int]:
-    th, tw = tpl.shape
-    H, W = gray.shape
-    y0 = max(0, int(H * y_min_ratio))
-    y1 = min(H - th, int(H * y_max_ratio))
-    x0 = max(0, int(W * x_min_ratio))
-    x1 = min(W - tw, int(W * x_max_ratio))
-    if y1 < y0 or x1 < x0:
-        return (-1.0, 0, 0)
-    best = (-1.0, x0, y0)
-    for y in range(y0, y1 + 1, coarse):
-        for x in range(x0, x1 + 1, coarse):
-            s = ncc_score(gray[y : y + th, x : x + tw], tpl)
-            if s > best[0]:
-                best = (s, x, y)
-    bx, by = best[1], best[2]
-    r = coarse + 3
-    for y in range(max(y0, by - r), min(y1, by + r + 1)):
-        for x in range(max(x0, bx - r), min(x1, bx + r + 1)):
-            s = ncc_score(gray[y : y + th, x : x + tw], tpl)
-            if s > best[0]:
-                best = (s, x, y)
-    return best
+) -> tuple[tuple[int, int, int, int], int, int]:
+    """
+    Isječak slike (x0, y0, x1, y1) potreban za traženje i najveći (y, x)
+    gornjeg lijevog kuta predloška unutar isječka. Gornji lijevi kut
+    predloška mora biti unutar udjela širine/visine; isječak se proširuje
+    za najveću varijantu da predložak stane.
+    """
+    ry0 = max(0, int(height * y_min_ratio))
+    rx0 = max(0, int(width * x_min_ratio))
+    ry1 = min(height, int(height * y_max_ratio))
+    rx1 = min(width, int(width * x_max_ratio))
+    max_h = max(v.gray.shape[0] for v in bank)
+    max_w = max(v.gray.shape[1] for v in bank)
+    box = (rx0, ry0, min(width, rx1 + max_w), min(height, ry1 + max_h))
+    return box, ry1 - ry0, rx1 - rx0
+
+
+def search_region(
+    region: np.ndarray,
+    bank: list[TemplateVariant],
+    levels: int,
+    top_k: int,
+    max_y: int,
+    max_x: int,
+) -> Match | None:
+    """
+    Coarse-to-fine traženje cijele banke predložaka u region (gornji lijevi
+    kut do (max_y, max_x)). Na najgrubljoj razini puna NCC mapa samo za
+    najmanje zarotiranu varijantu svake skale (par stupnjeva rotacije se na
+    toj rezoluciji ne vidi; s levels=0 za sve varijante), a top_k kandidata
+    po skali ide dalje. Na svakoj finijoj razini kandidat se dorađuje svim
+    kutovima svoje i susjednih skala u okolini ±2 px oko istog središta i
+    zadržava se top_k najboljih. Na punoj rezoluciji score je točan NCC
+    varijante.
+    """
+    regions = [region]
+    for _ in range(levels):
+        regions.append(_downsample(regions[-1]))
+
+    scales = sorted({v.scale for v in bank})
+    by_scale: dict[int, list[int]] = {}
+    for index, variant in enumerate(bank):
+        by_scale.setdefault(scales.index(variant.scale), []).append(index)
+
+    def limits(level: int, tpl: np.ndarray) -> tuple[int, int]:
+        """Najveći dopušteni (y, x) gornjeg lijevog kuta na razini."""
+        reg = regions[level]
+        return (
+            min(reg.shape[0] - tpl.shape[0], max_y >> level),
+            min(reg.shape[1] - tpl.shape[1], max_x >> level),
+        )
+
+    # Kandidat: (score, varijanta, x, y) gornjeg lijevog kuta na trenutnoj razini
+    candidates: list[tuple[float, int, int, int]] = []
+    coarse = regions[levels]
+    correlator = NccCorrelator(
+        coarse,
+        max(v.pyramid[levels].shape[0] for v in bank),
+        max(v.pyramid[levels].shape[1] for v in bank),
+    )
+    for members in by_scale.values():
+        # Bez piramide nema dorade pa se odmah traže svi kutovi
+        coarse_members = members if levels == 0 else [min(members, key=lambda i: abs(bank[i].angle))]
+        for index in coarse_members:
+            tpl = bank[index].pyramid[levels]
+            ly, lx = limits(levels, tpl)
+            if ly < 0 or lx < 0:
+                continue
+            scores = correlator.scores(tpl)[: ly + 1, : lx + 1]
+            radius = max(1, min(tpl.shape) // 2)
+            candidates.extend((s, index, x, y) for s, x, y in _top_peaks(scores, top_k, radius))
+
+    for level in range(levels - 1, -1, -1):
+        refined: dict[tuple[int, int, int], float] = {}
+        for _, index, x, y in candidates:
+            parent = bank[index].pyramid[level + 1]
+            # Središte kandidata na ovoj razini
+            cy, cx = 2 * y + parent.shape[0], 2 * x + parent.shape[1]
+            s = scales.index(bank[index].scale)
+            for neighbour in (s - 1, s, s + 1):
+                for other in by_scale.get(neighbour, []):
+                    tpl = bank[other].pyramid[level]
+                    th, tw = tpl.shape
+                    ly, lx = limits(level, tpl)
+                    oy, ox = cy - th // 2, cx - tw // 2
+                    y0, y1 = max(0, oy - 2), min(ly, oy + 2)
+                    x0, x1 = max(0, ox - 2), min(lx, ox + 2)
+                    if y1 < y0 or x1 < x0:
+                        continue
+                    scores = ncc_window(regions[level][y0 : y1 + th, x0 : x1 + tw], tpl)
+                    iy, ix = np.unravel_index(int(np.argmax(scores)), scores.shape)
+                    key = (other, x0 + int(ix), y0 + int(iy))
+                    refined[key] = max(refined.get(key, -1.0), float(scores[iy, ix]))
+        candidates = sorted(((s, i, x, y) for (i, x, y), s in refined.items()), reverse=True)[:top_k]
+
+    if not candidates:
+        return None
+    score, index, x, y = max(candidates)
+    variant = bank[index]
+    th, tw = variant.gray.shape
+    return Match(score, x, y, tw, th, variant.scale, variant.angle)
 
 
 def ring_median_rgb(img: Image.Image, x0: int, y0: int, x1: int, y1: int, ring: int = 6) -> tuple[int, int, int]:
-    px = img.load()
+    """Medijan boje u prstenu širine ring oko pravokutnika (x0, y0)-(x1, y1)."""
     w, h = img.size
-    samples: list[tuple[int, int, int]] = []
-    for y in range(max(0, y0 - ring), min(h, y1 + ring)):
-        for x in range(max(0, x0 - ring), min(w, x1 + ring)):
-            if x0 <= x < x1 and y0 <= y < y1:
-                continue
-            samples.append(px[x, y][:3])
-    if not samples:
+    ox0, oy0 = max(0, x0 - ring), max(0, y0 - ring)
+    ox1, oy1 = min(w, x1 + ring), min(h, y1 + ring)
+    if ox1 <= ox0 or oy1 <= oy0:
+        return (40, 44, 58)
+    arr = np.asarray(img.crop((ox0, oy0, ox1, oy1)).convert("RGB"))
+    mask = np.ones(arr.shape[:2], dtype=bool)
+    mask[y0 - oy0 : max(0, y1 - oy0), x0 - ox0 : max(0, x1 - ox0)] = False
+    samples = arr[mask]
+    if not len(samples):
         return (40, 44, 58)
-    arr = np.array(samples, dtype=np.int64)
-    return tuple(int(v) for v in np.median(arr, axis=0))
+    return tuple(int(v) for v in np.median(samples, axis=0))
+
+
+@dataclass
+class SparkleResult:
+    """Ishod jedne slike (redak manifesta)."""
+
+    file: str
+    status: str  # ok / skip / error
+    score: float | None = None
+    scale: float | None = None
+    angle: float | None = None
+    box: tuple[int, int, int, int] | None = None
+    seconds: float = 0.0
+    reason: str = ""
+    match: Match | None = None
+    sha256: str = ""
+    output_sha256: str = ""
+
+    def describe(self) -> str:
+        name = Path(self.file).name
+        if self.status == "ok":
+            x0, y0, x1, y1 = self.box
+            return (
+                f"  OK {name}: NCC={self.score:.3f} scale={self.scale:g} angle={self.angle:g} "
+                f"patch=({x0},{y0})-({x1},{y1})"
+            )
+        return f"  {self.status} {name}: {self.reason}"
 
 
 def remove_sparkle(
     path: Path,
-    tpl_gray: np.ndarray,
+    bank: list[TemplateVariant],
+    levels: int = 0,
+    top_k: int = 5,
     min_score: float = 0.52,
     margin: int = 8,
     y_min_ratio: float = 0.12,
     y_max_ratio: float = 1.0,
     x_min_ratio: float = 0.0,
     x_max_ratio: float = 1.0,
-) -> bool:
+    match: Match | None = None,
+) -> SparkleResult:
+    """
+    Nađe i zakrpa romb u path. match (npr. iz cachea, u koordinatama
+    slike) preskače traženje.
+    """
     im = Image.open(path).convert("RGB")
-    gray = np.array(im.convert("L"), dtype=np.float64)
-    score, x, y = find_best_match(
-        gray,
-        tpl_gray,
-        y_min_ratio=y_min_ratio,
-        y_max_ratio=y_max_ratio,
-        x_min_ratio=x_min_ratio,
-        x_max_ratio=x_max_ratio,
-    )
-    th, tw = tpl_gray.shape
+    if match is None:
+        box, max_y, max_x = roi_window(im.width, im.height, bank, y_min_ratio, y_max_ratio, x_min_ratio, x_max_ratio)
+        # Sivo (float32) samo za isječak u kojem se traži, ne za cijelu sliku
+        region = np.asarray(im.crop(box).convert("L"), dtype=np.float32)
+        match = search_region(region, bank, levels, top_k, max_y, max_x)
+        if match is None:
+            return SparkleResult(str(path), "skip", reason="ROI je manji od predloška")
+        match.x += box[0]
+        match.y += box[1]
+    score, x, y, tw, th = match.score, match.x, match.y, match.w, match.h
     if score < min_score:
-        print(f"  skip {path.name}: NCC={score:.3f} < {min_score}")
-        return False
+        return SparkleResult(
+            str(path), "skip", score, match.scale, match.angle, reason=f"NCC={score:.3f} < {min_score}", match=match
+        )
 
     x0 = max(0, x - margin)
     y0 = max(0, y - margin)
@@ -144,12 +439,211 @@ def remove_sparkle(
     im.paste(crop, (x0, y0))
 
     suf = path.suffix.lower()
+    buf = io.BytesIO()
     if suf in (".jpg", ".jpeg", ".jfif"):
-        im.save(path, "JPEG", quality=95, optimize=True)
+        im.save(buf, "JPEG", quality=95, optimize=True)
     else:
-        im.save(path, optimize=True)
-    print(f"  OK {path.name}: NCC={score:.3f} patch=({x0},{y0})-({x1},{y1})")
-    return True
+        im.save(buf, Image.registered_extensions()[suf], optimize=True)
+    data = buf.getvalue()
+    # Atomski zapis (privremena datoteka + os.replace) - prekid ne ostavlja pola slike
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return SparkleResult(
+        str(path), "ok", score, match.scale, match.angle, (x0, y0, x1, y1),
+        match=match, output_sha256=hashlib.sha256(data).hexdigest(),
+    )
+
+
+def process_image(path: Path, bank: list[TemplateVariant], levels: int, **kwargs) -> SparkleResult:
+    """remove_sparkle s mjerenjem vremena; greška jedne slike postaje redak manifesta."""
+    started = time.perf_counter()
+    try:
+        result = remove_sparkle(path, bank, levels, **kwargs)
+    except Exception as e:
+        result = SparkleResult(str(path), "error", reason=f"{type(e).__name__}: {e}")
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+# Banka predložaka u procesu radniku (--jobs): gradi se jednom po procesu
+_worker_bank: tuple[list[TemplateVariant], int] | None = None
+
+
+def _init_worker(template: Path, scales: list[float], angles: list[float], levels: int) -> None:
+    global _worker_bank
+    _worker_bank = build_template_bank(Image.open(template), scales, angles, levels)
+
+
+def _process_in_worker(path: Path, kwargs: dict) -> SparkleResult:
+    bank, levels = _worker_bank
+    return process_image(path, bank, levels, **kwargs)
+
+
+def run_batch(
+    tasks: list[tuple[Path, dict]],
+    jobs: int,
+    template: Path,
+    scales: list[float],
+    angles: list[float],
+    levels: int,
+) -> list[SparkleResult]:
+    """
+    (slika, kwargs za remove_sparkle) u jobs procesa; rezultati se ispisuju
+    redom kojim završe, a vraćaju redom zadataka. Ako radnik padne (npr.
+    nestane memorije), slika dobiva status error i ostale se nastavljaju.
+    """
+    results: dict[int, SparkleResult] = {}
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(template, scales, angles, levels)
+    ) as pool:
+        futures = {pool.submit(_process_in_worker, path, kwargs): i for i, (path, kwargs) in enumerate(tasks)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = SparkleResult(str(tasks[i][0]), "error", reason=f"{type(e).__name__}: {e}")
+            print(result.describe(), flush=True)
+            results[i] = result
+    return [results[i] for i in range(len(tasks))]
+
+
+MANIFEST_FIELDS = [
+    "file", "status", "score", "scale", "angle", "x0", "y0", "x1", "y1", "seconds", "reason", "sha256", "output_sha256",
+]
+
+
+def write_manifest(path: Path, results: list[SparkleResult], run: dict) -> None:
+    """Manifest obrade: .csv = jedan redak po slici, inače JSON s podacima o pokretanju."""
+    rows = []
+    for r in results:
+        x0, y0, x1, y1 = r.box if r.box else (None, None, None, None)
+        rows.append({
+            "file": r.file,
+            "status": r.status,
+            "score": None if r.score is None else round(r.score, 4),
+            "scale": r.scale,
+            "angle": r.angle,
+            "x0": x0,
+            "y0": y0,
+            "x1": x1,
+            "y1": y1,
+            "seconds": round(r.seconds, 3),
+            "reason": r.reason,
+            "sha256": r.sha256,
+            "output_sha256": r.output_sha256,
+        })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == ".csv":
+        with path.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        path.write_text(json.dumps({**run, "images": rows}, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def params_key(template_sha256: str, scales: list[float], angles: list[float], levels: int, kwargs: dict) -> str:
+    """Ključ parametara detekcije (predložak, banka, ROI, prag) za cache."""
+    params = {"template": template_sha256, "scales": scales, "angles": angles, "levels": levels, **kwargs}
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class SparkleCache:
+    """
+    Trajni cache detekcije (JSON, adresiran sadržajem). Za (parametri,
+    SHA-256 ulaza) pamti rezultat i SHA-256 izlaza koji je obrada
+    proizvela, a izlaz se upisuje kao "done" - neizmijenjena ili već
+    obrađena slika se tako preskače jednim dohvatom iz rječnika. Hash
+    datoteke se pamti po (veličina, mtime_ns) pa se ni ona ne čita ponovno.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.files: dict[str, dict] = {}
+        self.results: dict[str, dict] = {}
+
+    @classmethod
+    def load(cls, path: Path) -> SparkleCache:
+        cache = cls(path)
+        try:
+            with path.open(encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return cache
+        if state.get("version") == CACHE_VERSION:
+            cache.files = state.get("files", {})
+            cache.results = state.get("results", {})
+        return cache
+
+    def digest(self, path: Path) -> str:
+        stat = path.stat()
+        known = self.files.get(str(path))
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha256"]
+        sha = file_sha256(path)
+        self.files[str(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha}
+        return sha
+
+    def lookup(self, key: str, sha256: str) -> dict | None:
+        return self.results.get(f"{key}:{sha256}")
+
+    def record(self, key: str, result: SparkleResult) -> None:
+        """
+        Upiše ishod obrade (greške se ne pamte - ponovno pokretanje ih
+        pokušava opet). Slika koja je naš izlaz ("done") to i ostaje i kad
+        je --force ponovno obradi.
+        """
+        if result.status not in ("ok", "skip") or not result.sha256:
+            return
+        entry = {
+            "status": result.status,
+            "match": asdict(result.match) if result.match else None,
+            "box": list(result.box) if result.box else None,
+            "reason": result.reason,
+        }
+        if result.status == "ok":
+            entry["output"] = result.output_sha256
+            self.results[f"{key}:{result.output_sha256}"] = {**entry, "status": "done", "source": result.sha256}
+            path = Path(result.file)
+            stat = path.stat()
+            self.files[str(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": result.output_sha256}
+        if self.results.get(f"{key}:{result.sha256}", {}).get("status") != "done":
+            self.results[f"{key}:{result.sha256}"] = entry
+
+    def save(self) -> None:
+        """Atomski zapis (privremena datoteka + os.replace)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "files": self.files, "results": self.results}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def cached_result(path: Path, entry: dict, sha256: str) -> SparkleResult | None:
+    """Rezultat iz cachea bez obrade, ili None ako sliku treba (ponovno) zakrpati."""
+    match = Match(**entry["match"]) if entry["match"] else None
+    if entry["status"] == "done":
+        reason = "cache: već obrađeno"
+    elif entry["status"] == "skip":
+        reason = f"cache: {entry['reason']}"
+    else:
+        # Ulaz koji je već bio zakrpan (npr. vraćen iz backupa) - traženje se preskače, krpa se ponovno
+        return None
+    return SparkleResult(
+        str(path), "skip", match.score if match else None, match.scale if match else None,
+        match.angle if match else None, tuple(entry["box"]) if entry["box"] else None,
+        reason=reason, match=match, sha256=sha256,
+    )
 
 
 def main() -> None:
@@ -157,6 +651,19 @@ def main() -> None:
     ap.add_argument("--template", type=Path, required=True, help="Crop PNG romba iz slike")
     ap.add_argument("--assets", type=Path, default=DEFAULT_ASSETS)
     ap.add_argument("--min-score", type=float, default=0.50)
+    ap.add_argument(
+        "--scales",
+        default="0.8,0.9,1.0,1.12,1.25",
+        help="Skale predloška odvojene zarezom (za smanjene/povećane oglase)",
+    )
+    ap.add_argument("--angles", default="-6,-3,0,3,6", help="Kutovi rotacije predloška u stupnjevima")
+    ap.add_argument(
+        "--levels",
+        type=int,
+        default=-1,
+        help=f"Razine piramide (0 = samo puna rezolucija, -1 = auto, predložak >= {MIN_PYRAMID_SIDE}px)",
+    )
+    ap.add_argument("--top-k", type=int, default=5, help="Kandidata koji se dorađuju na svakoj finijoj razini")
     ap.add_argument(
         "--ymin-ratio",
         type=float,
@@ -182,6 +689,29 @@ def main() -> None:
         action="store_true",
         help="Uz --all: isti ROI za sve (ymin/quadrant s CLI-a), inače po datoteci",
     )
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Broj procesa za obradu (0 = broj CPU jezgri); svaki proces učita predložak jednom",
+    )
+    ap.add_argument(
+        "--manifest",
+        type=Path,
+        default=None,
+        help="Manifest obrade (.json ili .csv); uz --all default <assets>/sparkle-manifest-<vrijeme>.json",
+    )
+    ap.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help=f"Cache detekcije (JSON, po hashu slike i predloška); default <assets>/{CACHE_NAME}",
+    )
+    ap.add_argument(
+        "--force",
+        action="store_true",
+        help="Zanemari cache: traži i krpaj ponovno i već obrađene/neizmijenjene slike",
+    )
     ap.add_argument("files", nargs="*", help="Dodatne datoteke (inače četiri oglasi-*.jpg)")
     args = ap.parse_args()
 
@@ -195,9 +725,13 @@ def main() -> None:
     elif args.quadrant == "tl":
         x0, x1, y0, y1 = 0.0, 0.58, 0.0, 0.58
 
-    tpl = Image.open(args.template).convert("L")
-    tpl_gray = np.array(tpl, dtype=np.float64)
+    scales = [float(v) for v in args.scales.split(",") if v.strip()]
+    angles = [float(v) for v in args.angles.split(",") if v.strip()]
+    bank, levels = build_template_bank(Image.open(args.template), scales, angles, args.levels)
+    print(f"predložak: {len(bank)} varijanti ({len(scales)} skala × {len(angles)} kutova), {levels} razina piramide")
 
+    kwargs = {"top_k": args.top_k, "min_score": args.min_score}
+    tasks: list[tuple[Path, dict]] = []
     if args.all:
         paths = list_all_images(args.assets)
         if not paths:
@@ -206,32 +740,84 @@ def main() -> None:
         print(f"--all: {len(paths)} datoteka")
         for p in paths:
             ax0, ax1, ay0, ay1 = (x0, x1, y0, y1) if args.uniform else roi_ratios_for(p)
-            remove_sparkle(
-                p,
-                tpl_gray,
-                min_score=args.min_score,
-                y_min_ratio=ay0,
-                y_max_ratio=ay1,
-                x_min_ratio=ax0,
-                x_max_ratio=ax1,
-            )
-        return
+            roi = {"y_min_ratio": ay0, "y_max_ratio": ay1, "x_min_ratio": ax0, "x_max_ratio": ax1}
+            tasks.append((p, {**kwargs, **roi}))
+    else:
+        names = args.files if args.files else DEFAULT_NAMES
+        roi = {"y_min_ratio": y0, "y_max_ratio": y1, "x_min_ratio": x0, "x_max_ratio": x1}
+        for n in names:
+            p = args.assets / n if not Path(n).is_absolute() else Path(n)
+            if not p.is_file():
+                print(f"missing: {p}")
+                continue
+            tasks.append((p, {**kwargs, **roi}))
 
-    names = args.files if args.files else DEFAULT_NAMES
-    for n in names:
-        p = args.assets / n if not Path(n).is_absolute() else Path(n)
-        if not p.is_file():
-            print(f"missing: {p}")
-            continue
-        remove_sparkle(
-            p,
-            tpl_gray,
-            min_score=args.min_score,
-            y_min_ratio=y0,
-            y_max_ratio=y1,
-            x_min_ratio=x0,
-            x_max_ratio=x1,
-        )
+    started = time.perf_counter()
+    cache = SparkleCache.load(args.cache or args.assets / CACHE_NAME)
+    template_sha256 = file_sha256(args.template)
+    keys: list[str] = []
+    digests: list[str] = []
+    done: dict[int, SparkleResult] = {}
+    pending: list[int] = []
+    for i, (p, task_kwargs) in enumerate(tasks):
+        keys.append(params_key(template_sha256, scales, angles, args.levels, task_kwargs))
+        try:
+            digests.append(cache.digest(p))
+        except OSError:
+            digests.append("")
+        entry = None if args.force or not digests[i] else cache.lookup(keys[i], digests[i])
+        if entry is not None:
+            result = cached_result(p, entry, digests[i])
+            if result is not None:
+                print(result.describe())
+                done[i] = result
+                continue
+            tasks[i] = (p, {**task_kwargs, "match": Match(**entry["match"])})
+        pending.append(i)
+    if done:
+        print(f"cache: {len(done)} preskočeno, {len(pending)} za obradu")
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    jobs = min(jobs, len(pending))
+    if jobs > 1:
+        print(f"--jobs: {jobs} procesa")
+        batch = run_batch([tasks[i] for i in pending], jobs, args.template, scales, angles, args.levels)
+    else:
+        batch = []
+        for i in pending:
+            p, task_kwargs = tasks[i]
+            result = process_image(p, bank, levels, **task_kwargs)
+            print(result.describe())
+            batch.append(result)
+    for i, result in zip(pending, batch):
+        result.sha256 = digests[i]
+        cache.record(keys[i], result)
+        done[i] = result
+    if pending:
+        try:
+            cache.save()
+        except OSError as e:
+            # Slike su već zakrpane - bez cachea iduće pokretanje ih samo ponovno pretraži
+            print(f"[WARN] cache nije spremljen ({cache.path}): {e}")
+    results = [done[i] for i in range(len(tasks))]
+    seconds = time.perf_counter() - started
+
+    counts = {status: sum(r.status == status for r in results) for status in ("ok", "skip", "error")}
+    print(f"gotovo: {counts['ok']} ok, {counts['skip']} skip, {counts['error']} error, {seconds:.2f} s")
+    manifest = args.manifest
+    if manifest is None and args.all:
+        manifest = args.assets / f"sparkle-manifest-{datetime.now():%Y%m%d-%H%M%S}.json"
+    if manifest is not None:
+        write_manifest(manifest, results, {
+            "template": str(args.template),
+            "scales": scales,
+            "angles": angles,
+            "levels": levels,
+            "jobs": max(jobs, 1),
+            "seconds": round(seconds, 3),
+            "counts": counts,
+        })
+        print(f"manifest: {manifest}")
 
 
 if __name__ == "__main__":
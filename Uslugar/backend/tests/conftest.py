@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Testovi za backup_fix: pokretanje iz Uslugar/backend s python -m pytest tests."""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+
+@pytest.fixture
+def load_script():
+    """Skripta iz backend direktorija kao modul (ime ima crtice), svaki put nova kopija."""
+    def load(filename):
+        name = filename[:-len('.py')].replace('-', '_').lower()
+        spec = importlib.util.spec_from_file_location(name, BACKEND / filename)
+        module = importlib.util.module_from_spec(spec)
+        # Paralelna obrada pickla funkcije modula po imenu
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        return module
+    return load
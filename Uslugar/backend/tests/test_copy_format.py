@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+decode_copy_line / encode_copy_line na stvarnom COPY text formatu.
+
+COPY_OUT retci su izlaz PostgreSQL 16 `COPY copyfx TO STDOUT`, a COPY_IN
+retci su ulaz koji je `COPY copyin FROM STDIN` prihvatio; očekivane
+vrijednosti su ono što je baza spremila (encode(convert_to(v, 'UTF8'), 'hex')).
+"""
+
+import pytest
+
+from backup_fix.copy_format import decode_copy_line, encode_copy_line, unescape_copy_field
+
+COPY_OUT = [
+    ('1\ta\\bb\\fc\\nd\\re\\tf\\vg', ['1', 'a\bb\fc\nd\re\tf\vg']),
+    ('2\tback\\\\slash', ['2', 'back\\slash']),
+    ('3\t\\N', ['3', None]),
+    ('4\t', ['4', '']),
+    ('5\t\\\\N', ['5', '\\N']),
+    ('6\tČišćenje \\\\ž', ['6', 'Čišćenje \\ž']),
+    ('7\tPlinoinstalat├ęr', ['7', 'Plinoinstalat├ęr']),
+    ('8\ttab\\tna kraju\\t', ['8', 'tab\tna kraju\t']),
+]
+
+COPY_IN = [
+    ('\\101\\102\\1031', bytes.fromhex('41424331')),
+    ('\\x41\\x4a\\x4Bz', bytes.fromhex('414a4b7a')),
+    ('\\304\\215e\\305\\276', bytes.fromhex('c48d65c5be')),
+    ('\\xc4\\x8de', bytes.fromhex('c48d65')),
+    ('\\\\\\305\\276', bytes.fromhex('5cc5be')),
+    ('\\q\\ž', bytes.fromhex('71c5be')),
+]
+
+
+@pytest.mark.parametrize('line, expected', COPY_OUT)
+def test_decode_copy_out(line, expected):
+    assert decode_copy_line(line) == expected
+
+
+@pytest.mark.parametrize('line, expected', COPY_OUT)
+def test_encode_round_trip(line, expected):
+    assert encode_copy_line(expected) == line
+    assert decode_copy_line(encode_copy_line(expected)) == expected
+
+
+@pytest.mark.parametrize('field, expected', COPY_IN)
+def test_unescape_byte_escapes(field, expected):
+    assert unescape_copy_field(field).encode('utf-8') == expected
+
+
+def test_escaped_newline_becomes_real_newline():
+    # \n i \r u polju daju stvarne znakove novog reda, ne literalni backslash + n
+    assert decode_copy_line('1\tprvi\\ndrugi\\r') == ['1', 'prvi\ndrugi\r']
+
+
+def test_null_only_for_whole_field():
+    assert decode_copy_line('\\N\tx\\N\t\\\\N') == [None, 'xN', '\\N']
+
+
+def test_invalid_octal_byte_raises():
+    # \377 nije ispravan UTF-8 - pozivatelj odlučuje (preskakanje / --strict)
+    with pytest.raises(UnicodeDecodeError):
+        unescape_copy_field('\\377')
+
+
+@pytest.mark.parametrize('line, expected', [
+    # Ulaz koji je COPY copyin FROM STDIN prihvatio: \<TAB> je tab u polju
+    ('x\\\ty\tz', ['x\ty', 'z']),
+    ('\\\\\tq', ['\\', 'q']),
+    ('1\\\\\\\t2\t3', ['1\\\t2', '3']),
+    ('\\\t\t\\N', ['\t', None]),
+])
+def test_escaped_literal_tab_stays_in_field(line, expected):
+    assert decode_copy_line(line) == expected
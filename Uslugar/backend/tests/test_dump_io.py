@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from backup_fix.dump_io import SqlWriter, part_path
+
+
+def _write(output, statements, split_mb):
+    writer = SqlWriter(output, title='TEST', source='test', noun='statementa', split_mb=split_mb)
+    for i in range(statements):
+        writer.write(f"UPDATE t SET v = '{'x' * 400}' WHERE id = {i};")
+    return writer.close()
+
+
+def test_split_rerun_removes_stale_parts(tmp_path):
+    output = tmp_path / 'UPDATE.sql'
+    assert len(_write(output, 30, split_mb=0.001)) == 15
+    other = tmp_path / 'OTHER.part001.sql'
+    other.write_text('-- drugi izlaz\n', encoding='utf-8')
+
+    paths = _write(output, 6, split_mb=0.001)
+    assert paths == [part_path(output, part) for part in (1, 2, 3)]
+    assert sorted(tmp_path.iterdir()) == sorted(paths + [other])
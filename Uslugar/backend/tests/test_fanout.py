@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from backup_fix.fanout import InsertSink, UpdateSink, scan_dump, scan_lines
+from backup_fix.patterns import INSERT_PATTERNS, UPDATE_PATTERNS
+from backup_fix.repair import RepairCache, make_repair_engine
+
+DUMP = [
+    'CREATE TABLE public."Category" (',
+    '    id text NOT NULL,',
+    '    name text',
+    ');',
+    'COPY public."Category" (id, name) FROM stdin;',
+    'a\tVodoinstalat┼żer',
+    'b\tneispravan \\377 bajt ┼ż',
+    'c\tElektri─Źar',
+    '\\.',
+]
+
+
+def _lines():
+    return ((num, (line + '\n').encode('utf-8')) for num, line in enumerate(DUMP, 1))
+
+
+def _sink(tmp_path):
+    repair = RepairCache(make_repair_engine(UPDATE_PATTERNS), 0)
+    return UpdateSink(tmp_path / 'UPDATE.sql', repair)
+
+
+def test_unparsable_row_is_counted_and_skipped(tmp_path):
+    run = scan_lines(_lines(), [_sink(tmp_path)])
+    summary = run['sinks']['update']
+    assert summary['unparsable'] == 1
+    assert summary['fixed'] == 2
+    text = (tmp_path / 'UPDATE.sql').read_text(encoding='utf-8')
+    assert "'Vodoinstalatžer'" in text and "'Električar'" in text
+
+
+def test_unparsable_row_fails_strict_run(tmp_path):
+    with pytest.raises(ValueError, match='Linija 7'):
+        scan_lines(_lines(), [_sink(tmp_path)], strict=True)
+    # Prekinut izlaz ostaje bez COMMIT-a
+    assert 'COMMIT;' not in (tmp_path / 'UPDATE.sql').read_text(encoding='utf-8')
+
+
+@pytest.mark.parametrize('update_mode', ['column', 'batch'])
+def test_update_script_matches_fanout(load_script, tmp_path, update_mode):
+    dump = tmp_path / 'dump.sql'
+    dump.write_bytes(''.join(line + '\n' for line in DUMP).encode('utf-8'))
+    script = load_script('GENERATE-UPDATE-FROM-BACKUP.py')
+    assert script.process_backup_file(dump, tmp_path / 'script.sql', update_mode=update_mode, use_index=False)
+    repair = RepairCache(make_repair_engine(UPDATE_PATTERNS), 0)
+    sink = UpdateSink(tmp_path / 'fanout.sql', repair, update_mode=update_mode, source=dump)
+    scan_dump(dump, [sink], use_index=False)
+    assert (tmp_path / 'script.sql').read_bytes() == (tmp_path / 'fanout.sql').read_bytes()
+
+
+def test_insert_script_matches_fanout(load_script, tmp_path):
+    dump = tmp_path / 'dump.sql'
+    dump.write_bytes(''.join(line + '\n' for line in DUMP).encode('utf-8'))
+    script = load_script('GENERATE-INSERT-CATEGORY.py')
+    assert script.process_category_backup(dump, tmp_path / 'script.sql', output_mode='multi', use_index=False)
+    repair = RepairCache(make_repair_engine(INSERT_PATTERNS), 0)
+    sink = InsertSink(tmp_path / 'fanout.sql', ['Category'], repair, output_mode='multi', source=dump)
+    scan_dump(dump, [sink], use_index=False)
+    assert (tmp_path / 'script.sql').read_bytes() == (tmp_path / 'fanout.sql').read_bytes()
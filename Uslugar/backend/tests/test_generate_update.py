@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import re
+
+import pytest
+
+DUMP = '\n'.join([
+    'CREATE TABLE public."Category" (',
+    '    id text NOT NULL,',
+    '    name text',
+    ');',
+    'COPY public."Category" (id, name) FROM stdin;',
+    'a\tVodoinstalat┼żer',
+    'b\tneispravan \\377 bajt ┼ż',
+    'c\tElektri─Źar',
+    '\\.',
+    '',
+])
+
+
+@pytest.fixture
+def script(load_script):
+    return load_script('GENERATE-UPDATE-FROM-BACKUP.py')
+
+
+@pytest.fixture
+def dump(tmp_path):
+    path = tmp_path / 'dump.sql'
+    path.write_bytes(DUMP.encode('utf-8'))
+    return path
+
+
+def test_unparsable_warning_in_every_run(script, dump, tmp_path, capsys):
+    for run in range(2):
+        assert script.process_backup_file(dump, tmp_path / f'UPDATE{run}.sql', use_index=False)
+        err = capsys.readouterr().err
+        assert 'Linija 7 (tablica Category): redak se ne moze dekodirati' in err
+
+
+def _write_dump(path, rows):
+    lines = ['CREATE TABLE public."Category" (', '    id text NOT NULL,', '    name text', ');',
+             'COPY public."Category" (id, name) FROM stdin;']
+    path.write_bytes('\n'.join(lines + [f'{id_value}\t{name}' for id_value, name in rows] + ['\\.', '']).encode('utf-8'))
+    return path
+
+
+def test_since_skips_unchanged_rows(script, tmp_path, capsys):
+    previous = _write_dump(tmp_path / 'prev.sql', [('a', 'Vodoinstalat┼żer'), ('c', 'Elektri─Źar')])
+    current = _write_dump(tmp_path / 'curr.sql', [
+        ('a', 'Vodoinstalat┼żer'),
+        ('c', 'Elektri─Źar i vodoinstalat┼żer'),
+        ('d', 'Elektri─Źar'),
+    ])
+    output = tmp_path / 'UPDATE.sql'
+    assert script.process_backup_file(current, output, since=previous, use_index=False)
+    text = output.read_text(encoding='utf-8')
+    assert "WHERE id = 'a'" not in text
+    assert "WHERE id = 'c'" in text and "WHERE id = 'd'" in text
+    out = capsys.readouterr().out
+    assert '1 redaka nepromijenjeno' in out
+    assert 'Generirano 2 UPDATE statementa (2 popravljenih vrijednosti)' in out
+
+
+@pytest.mark.parametrize('update_mode', ['column', 'batch'])
+def test_parallel_output_matches_serial(script, tmp_path, capsys, update_mode):
+    damaged = ['Vodoinstalat┼żer', 'Elektri─Źar', 'ok', 'ZAVR┼íEN']
+    dump = _write_dump(tmp_path / 'dump.sql', [(f'id-{i}', f'{damaged[i % 4]} {i}') for i in range(400)])
+    serial, parallel = tmp_path / 'serial.sql', tmp_path / 'parallel.sql'
+    assert script.process_backup_file(dump, serial, update_mode=update_mode, batch_size=7)
+    assert script.process_backup_file(dump, parallel, update_mode=update_mode, batch_size=7, jobs=2, chunk_mb=0.002)
+    chunks = re.search(r'Paralelna obrada: (\d+) dijelova', capsys.readouterr().out)
+    assert chunks and int(chunks.group(1)) > 1
+    assert parallel.read_bytes() == serial.read_bytes()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import random
+import re
+
+import pytest
+
+from backup_fix.patterns import INSERT_PATTERNS, UPDATE_PATTERNS
+from backup_fix.repair import RepairCache, RepairEngine, make_repair_engine
+
+
+def test_cache_keeps_only_values_that_need_repair():
+    cache = RepairCache(make_repair_engine(UPDATE_PATTERNS), 1)
+    assert cache.repair('cmabc123') == 'cmabc123'
+    assert cache.repair('2024-01-01 10:00:00') == '2024-01-01 10:00:00'
+    assert cache.repair('Vodoinstalat┼żer') == 'Vodoinstalatžer'
+    assert cache.repair('Vodoinstalat┼żer') == 'Vodoinstalatžer'
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert list(cache._entries) == ['Vodoinstalat┼żer']
+
+
+# Uzorci gdje redoslijed liste mijenja rezultat: 'ab' se preklapa s ranijim 'bc'
+OVERLAP_PATTERNS = [('bc', 'Y'), ('ab', 'X'), ('Y', 'Z')]
+
+
+@pytest.mark.parametrize('patterns, text, expected', [
+    (UPDATE_PATTERNS, 'Vodoinstalat┼żer', 'Vodoinstalatžer'),
+    (UPDATE_PATTERNS, 'bez popravka', 'bez popravka'),
+    (UPDATE_PATTERNS, '<|>', 'ž>'),
+    (UPDATE_PATTERNS, 'red\\nred', 'red\nred'),
+    # Kaskada: zamjena stvara pogodak kasnijeg uzorka
+    (UPDATE_PATTERNS, 'ZAVR┼íEN', 'ZAVRŠEN'),
+    (UPDATE_PATTERNS, 'Â┼í', 'š'),
+    (INSERT_PATTERNS, '├ęZAVR┼íEN', 'eZAVRŠEN'),
+    # Preklapanje: jedan re.sub bi dao 'Xc'
+    (OVERLAP_PATTERNS, 'abc', 'aZ'),
+    (OVERLAP_PATTERNS, 'abab', 'XX'),
+])
+def test_repair_matches_sequential(patterns, text, expected):
+    engine = RepairEngine(patterns)
+    assert engine.repair_sequential(text) == expected
+    assert engine.repair(text) == expected
+
+
+@pytest.mark.parametrize('patterns', [UPDATE_PATTERNS, INSERT_PATTERNS, OVERLAP_PATTERNS])
+def test_repair_matches_sequential_random(patterns):
+    engine = RepairEngine(patterns)
+    # Dijelovi uzoraka i zamjena + obični znakovi, da nastanu i djelomični i susjedni pogoci
+    pieces = ['a', ' ', 'E', 'N', '\\', 'n']
+    for pattern, replacement in patterns:
+        literal = re.sub(r'\\(.)', r'\1', pattern)
+        pieces += [literal, literal[:1], literal[1:], replacement]
+    rng = random.Random(1)
+    for _ in range(3000):
+        text = ''.join(rng.choice(pieces) for _ in range(rng.randint(1, 8)))
+        assert engine.repair(text) == engine.repair_sequential(text), repr(text)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from backup_fix.shards import iter_statements, plan_shards, split_statement
+from backup_fix.sql_format import UpdateBuilder, escape_sql_string
+
+
+def _read_shards(summary):
+    text = ''
+    for shard in summary:
+        for path in shard['paths']:
+            with open(path, encoding='utf-8', newline='') as f:
+                text += f.read()
+    return text
+
+
+def test_escape_sql_string_writes_cr_as_escape():
+    assert escape_sql_string('a\rb') == "E'a\\rb'"
+    assert escape_sql_string("it's") == "'it''s'"
+
+
+@pytest.mark.parametrize('mode', ['column', 'batch'])
+def test_plan_shards_keeps_values_with_cr(tmp_path, mode):
+    builder = UpdateBuilder(mode, batch_size=10)
+    statements = []
+    for i in range(6):
+        statements += builder.add('Category', f'id-{i}', [('name', f'Vodoinstalater\r{i}')])
+    statements += builder.flush()
+    source = tmp_path / 'UPDATE.sql'
+    source.write_text('BEGIN;\n' + '\n'.join(statements) + '\nCOMMIT;\n', encoding='utf-8', newline='')
+    assert b'\r' not in source.read_bytes()
+
+    summary = plan_shards([source], tmp_path / 'OUT.sql', 3)
+    assert sum(shard['rows'] for shard in summary) == 6
+    assert _read_shards(summary).count('Vodoinstalater\\r') == 6
+
+
+def test_plan_shards_legacy_raw_cr(tmp_path):
+    # Datoteke generirane prije escapanja \r imaju stvarni CR unutar literala
+    source = tmp_path / 'UPDATE.sql'
+    source.write_text(
+        'BEGIN;\n'
+        "UPDATE \"Category\" SET \"name\" = 'a\rb' WHERE id = 'x';\n"
+        'UPDATE "Category" AS t SET "name" = COALESCE(v."name", t."name")\n'
+        'FROM (VALUES\n'
+        '((NULL::"Category").id, (NULL::"Category")."name"),\n'
+        "('y', 'c\rd'),\n"
+        "('z', 'e')\n"
+        ') AS v(id, "name")\n'
+        'WHERE t.id = v.id;\n'
+        'COMMIT;\n',
+        encoding='utf-8',
+        newline='',
+    )
+    statements = list(iter_statements([source]))
+    assert len(statements) == 2
+    assert statements[0] == ["UPDATE \"Category\" SET \"name\" = 'a\rb' WHERE id = 'x';"]
+
+    summary = plan_shards([source], tmp_path / 'OUT.sql', 2)
+    assert sum(shard['rows'] for shard in summary) == 3
+    text = _read_shards(summary)
+    assert "'a\rb'" in text and "'c\rd'" in text
+
+
+def test_split_statement_without_rows_raises():
+    lines = [
+        'UPDATE "Category" AS t SET "name" = COALESCE(v."name", t."name")',
+        "'ostatak literala';",
+    ]
+    with pytest.raises(ValueError):
+        split_statement(lines, 4)
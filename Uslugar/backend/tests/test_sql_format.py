@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from backup_fix.sql_format import InsertBuilder
+
+
+def test_upsert_updates_non_key_columns():
+    builder = InsertBuilder('public."Category"', ['id', 'name'], upsert_key='id')
+    assert builder.add(["'a'", "'Vodoinstalater'"]) == (
+        'INSERT INTO public."Category" (id, name) VALUES '
+        "('a', 'Vodoinstalater') ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name;"
+    )
+
+
+def test_upsert_with_only_key_column_does_nothing_on_conflict():
+    builder = InsertBuilder('public."Tag"', ['id'], batch_size=2, upsert_key='id')
+    assert builder.add(["'a'"]) is None
+    assert builder.add(["'b'"]) == (
+        'INSERT INTO public."Tag" (id) VALUES\n'
+        "('a'),\n"
+        "('b')\n"
+        'ON CONFLICT (id) DO NOTHING;'
+    )
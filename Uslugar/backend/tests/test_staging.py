@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+from backup_fix.staging import import_dump, iter_staged_lines
+
+DUMP = '\n'.join([
+    'CREATE TABLE public."Category" (',
+    '    id text NOT NULL,',
+    '    position integer,',
+    '    name text',
+    ');',
+    'COPY public."Category" (id, "position", name) FROM stdin;',
+    'a\t1\tVodoinstalater',
+    'b\t2\tneispravan \\377 bajt',
+    'c\t3\tElektricar',
+    '\\.',
+    '',
+])
+
+
+def test_undecodable_row_is_kept_raw(tmp_path):
+    dump = tmp_path / 'dump.sql'
+    dump.write_bytes(DUMP.encode('utf-8'))
+    db = tmp_path / 'staging.db'
+    info = import_dump(dump, db, use_index=False)
+    assert info['rows'] == 3
+    assert info['bad_rows'] == 1
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute('SELECT id, position, name FROM "Category" ORDER BY rowid').fetchall()
+    assert rows == [('a', 1, 'Vodoinstalater'), (None, None, None), ('c', 3, 'Elektricar')]
+    # Sirovi redak se vraća nepromijenjen
+    lines = [raw for _, raw in iter_staged_lines(db)]
+    assert b'b\t2\tneispravan \\377 bajt' in [line.rstrip(b'\n') for line in lines]